@@ -0,0 +1,80 @@
+import functools
+import time
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.urls import URLPattern
+
+# Маршруты, запросы чтения к которым под ASGI обслуживаются асинхронно.
+ASYNC_ROUTES = (
+    'recipes-list', 'recipes-detail', 'recipes-download-shopping-cart',
+    'ingredients-list', 'ingredients-detail', 'tags-list', 'tags-detail',
+)
+READ_METHODS = ('GET', 'HEAD')
+
+
+def is_thread_sensitive(request):
+    """Нужно ли выполнять запрос в общем потоке процесса.
+
+    Синхронные view в Django 3.2 под ASGI выполняются в одном общем
+    потоке на процесс. Чтение отдаётся в пул потоков asgiref (размер
+    задаёт ASGI_THREADS), где запросы идут параллельно; запись, как и у
+    остальных view, остаётся в общем потоке.
+    """
+    return (request.method not in READ_METHODS
+            or settings.ASYNC_VIEWS_THREAD_SENSITIVE)
+
+
+def run_view(view, thread_sensitive, request, *args, **kwargs):
+    """Выполняет view DRF в рабочем потоке вместе с отрисовкой ответа.
+
+    Потоковое содержимое вычитывается здесь же: Django 3.2 перебирает
+    его в цикле событий, где запросы к БД запрещены, поэтому ответ
+    целиком держится в памяти и отправляется клиенту по частям уже без
+    обращений к БД. Устаревшие соединения потока пула закрываются так
+    же, как по сигналу request_finished; соединения общего потока
+    Django закрывает сам.
+    """
+    timing = getattr(request, '_timing', None)
+    try:
+        with (connection.execute_wrapper(timing) if timing is not None
+              else nullcontext()):
+            response = view(request, *args, **kwargs)
+            if timing is not None:
+                timing.view_finished = time.perf_counter()
+            if callable(getattr(response, 'render', None)):
+                response.render()
+            elif response.streaming:
+                response.streaming_content = list(response.streaming_content)
+        return response
+    finally:
+        if not thread_sensitive:
+            close_old_connections()
+
+
+def offload(view):
+    """Асинхронная обёртка над синхронным view.
+
+    Атрибуты view (cls, actions, csrf_exempt) копируются, поэтому
+    middleware и CSRF видят обёртку так же, как исходный view.
+    """
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        thread_sensitive = is_thread_sensitive(request)
+        return await sync_to_async(
+            run_view, thread_sensitive=thread_sensitive
+        )(view, thread_sensitive, request, *args, **kwargs)
+
+    return async_view
+
+
+def offload_routes(urls):
+    """Заменяет view маршрутов из ASYNC_ROUTES асинхронными обёртками."""
+    return [
+        URLPattern(url.pattern, offload(url.callback), url.default_args,
+                   url.name)
+        if url.name in ASYNC_ROUTES else url
+        for url in urls
+    ]
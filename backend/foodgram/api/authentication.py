@@ -0,0 +1,142 @@
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_KEY = 'auth_token:{}'
+TOKEN_VERSION_KEY = 'auth_token_version:{}'
+
+# Поля пользователя, которые хранятся в кэше. Пароль и счётчики в кэш
+# не попадают: остальные поля загружаются из БД при обращении и не
+# записываются обычным save().
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name',
+               'is_active', 'is_staff', 'is_superuser')
+
+auth_cache_stats = Counter(hits=0, misses=0)
+
+
+class LocalCache:
+    """LRU-кэш с TTL в памяти процесса.
+
+    Повторяет методы get, set и delete кэшей Django, чтобы
+    аутентификация работала с ним и с любым бэкендом из CACHES.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires <= time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.data[key] = value, time.monotonic() + timeout
+            self.data.move_to_end(key)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+local_cache = LocalCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
+
+def get_token_cache():
+    if settings.AUTH_TOKEN_CACHE == 'local':
+        return local_cache
+    return caches[settings.AUTH_TOKEN_CACHE]
+
+
+def get_cached_fields(model):
+    # Model.from_db ждёт значения в порядке полей модели.
+    return [field.attname for field in model._meta.concrete_fields
+            if field.attname in USER_FIELDS]
+
+
+def get_token_cache_keys(key):
+    # В общем кэше ключи видны всем клиентам, поэтому токен хэшируется.
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return TOKEN_KEY.format(digest), TOKEN_VERSION_KEY.format(digest)
+
+
+def invalidate_token(key):
+    """Сбрасывает запись токена во всех процессах.
+
+    Версия токена всегда хранится в кэше default, общем для воркеров.
+    Без неё запись, сохранённая в том числе в локальном кэше другого
+    процесса или запросом, читавшим БД до сброса, недействительна.
+    """
+    cache_key, version_key = get_token_cache_keys(key)
+    get_token_cache().delete(cache_key)
+    caches['default'].delete(version_key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кэшем токен -> пользователь.
+
+    Кэш задаётся AUTH_TOKEN_CACHE: имя кэша из CACHES или local — LRU
+    в памяти процесса на AUTH_TOKEN_CACHE_SIZE записей. Запись хранит
+    USER_FIELDS и версию токена, живёт AUTH_TOKEN_CACHE_TIMEOUT секунд
+    и сбрасывается при выходе, изменении и деактивации пользователя
+    через api.signals. Изменения через QuerySet.update сигналов не шлют
+    и видны по истечении TTL.
+    """
+
+    def get_versioned(self, cache, cache_key, version_key):
+        shared_cache = caches['default']
+        if cache is shared_cache:
+            values = cache.get_many((cache_key, version_key))
+            cached, version = values.get(cache_key), values.get(version_key)
+        else:
+            cached, version = cache.get(cache_key), shared_cache.get(
+                version_key)
+        if version is None:
+            # Версия заводится до чтения БД: сброс во время загрузки
+            # удалит её, и сохранённая запись не совпадёт с новой.
+            shared_cache.add(version_key, time.time_ns(), None)
+            version = shared_cache.get(version_key)
+        return cached, version
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cache_key, version_key = get_token_cache_keys(key)
+        cached, version = self.get_versioned(cache, cache_key, version_key)
+        if cached is not None and cached[0] == version:
+            auth_cache_stats['hits'] += 1
+            # Объекты собираются заново: из локального кэша они были бы
+            # общими для потоков.
+            model = get_user_model()
+            user = model.from_db(
+                router.db_for_read(model), get_cached_fields(model),
+                cached[1])
+            token = self.get_model()(key=key, user=user)
+            return user, token
+        auth_cache_stats['misses'] += 1
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (version, tuple(
+            getattr(user, field) for field in get_cached_fields(type(user))
+        )), settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return user, token
@@ -0,0 +1,124 @@
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from recipes.versions import get_versions
+from rest_framework import status
+from rest_framework.response import Response
+
+RESPONSE_CACHE_KEY = 'api_response:{}'
+
+cache_stats = Counter(hits=0, misses=0)
+
+
+def get_request_digest(request, *parts):
+    query = sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    )
+    raw_key = repr((
+        *parts, request.path, query, request.accepted_media_type))
+    return hashlib.md5(raw_key.encode()).hexdigest()
+
+
+class ScopeVersionsMixin:
+    cache_scopes = ()
+
+    def get_cache_scopes(self):
+        return self.cache_scopes
+
+    def get_scope_versions(self):
+        if not hasattr(self, '_scope_versions'):
+            self._scope_versions = get_versions(*self.get_cache_scopes())
+        return self._scope_versions
+
+
+class ConditionalGetMixin(ScopeVersionsMixin):
+    """Отдаёт 304 на list и retrieve, если ETag клиента не устарел.
+
+    ETag строится из версий областей данных, параметров запроса и
+    get_etag_extra(), поэтому проверка не выполняет сериализацию. Для
+    авторизованных пользователей учитывается версия их избранного,
+    списка покупок и подписок.
+    """
+
+    def get_etag_extra(self):
+        return None
+
+    def get_etag(self, request):
+        versions = self.get_scope_versions()
+        user = request.user
+        if user.is_authenticated:
+            versions += (user.id, *get_versions(f'user:{user.id}'))
+        digest = get_request_digest(request, versions, self.get_etag_extra())
+        return f'"{digest}"'
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = {
+                tag[2:] if tag.startswith('W/') else tag
+                for tag in parse_etags(if_none_match)
+            }
+            if '*' in etags or etag in etags:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                patch_vary_headers(response, ('Authorization',))
+                return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class AnonymousCacheMixin(ScopeVersionsMixin):
+    """Кэширует отрисованные ответы list и retrieve для анонимов.
+
+    Ключ строится из пути, отсортированных параметров запроса и версий
+    областей данных из get_cache_scopes(). Запись данных в этих областях
+    меняет версию, и старые ответы больше не находятся.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = RESPONSE_CACHE_KEY.format(
+            get_request_digest(request, self.get_scope_versions()))
+        cached = cache.get(key)
+        if cached is not None:
+            cache_stats['hits'] += 1
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+        cache_stats['misses'] += 1
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            response.add_post_render_callback(lambda rendered: cache.set(
+                key,
+                (rendered.content, rendered['Content-Type']),
+                settings.API_CACHE_TIMEOUT,
+            ))
+        return response
@@ -1,32 +1,91 @@
+from django import forms
+from django.db.models import Count
+from django_filters.fields import MultipleChoiceField
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Ingredient, Recipe, Tag
-from rest_framework.filters import SearchFilter
+from recipes.models import Recipe
+from recipes.pantry_index import filter_recipe_ids, pantry_index
+from recipes.search import search_recipes
+from recipes.tag_index import get_tag_choices, tag_index
 
+TAGS_MODES = (
+    ('any', 'Хотя бы один из тегов'),
+    ('all', 'Все теги'),
+)
 
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
 
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    field_class = forms.IntegerField
+
+
+class IntegerFilter(filters.NumberFilter):
+    field_class = forms.IntegerField
+
+
+class TagSlugField(MultipleChoiceField):
+    def validate(self, value):
+        # Неизвестный slug перечитывает соответствие до проверки choices.
+        if value:
+            tag_index.get_ids(value)
+        super().validate(value)
+
+
+class TagSlugFilter(filters.MultipleChoiceFilter):
+    field_class = TagSlugField
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
+    tags = TagSlugFilter(
+        choices=get_tag_choices,
+        method='filter_tags'
     )
+    tags_mode = filters.ChoiceFilter(choices=TAGS_MODES, method='skip_filter')
     is_favorited = filters.BooleanFilter(
         method='filter_favorite_or_cart'
     )
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_favorite_or_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ingredients = NumberInFilter(method='skip_filter')
+    exclude_ingredients = NumberInFilter(method='skip_filter')
+    max_missing = IntegerFilter(method='skip_filter', min_value=0)
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'tags_mode', 'author', 'is_favorited',
+                  'is_in_shopping_cart', 'search', 'ingredients',
+                  'exclude_ingredients', 'max_missing')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        data = self.form.cleaned_data
+        ingredients = data.get('ingredients')
+        exclude_ingredients = data.get('exclude_ingredients') or ()
+        if ingredients:
+            return filter_recipe_ids(queryset, pantry_index.cookable(
+                ingredients, exclude_ingredients, data.get('max_missing') or 0
+            ))
+        if exclude_ingredients:
+            return filter_recipe_ids(
+                queryset, pantry_index.containing(exclude_ingredients),
+                exclude=True)
+        return queryset
+
+    def filter_tags(self, queryset, name, value):
+        """Оставляет рецепты с любым или со всеми указанными тегами.
+
+        Фильтр — подзапрос id IN по таблице связей рецептов и тегов,
+        поэтому рецепт с несколькими подходящими тегами не дублируется
+        и DISTINCT не нужен.
+        """
+        ids = tag_index.get_ids()
+        tag_ids = {ids[slug] for slug in value if slug in ids}
+        recipe_tags = Recipe.tags.through.objects.filter(tag_id__in=tag_ids)
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            recipe_tags = recipe_tags.values('recipe_id').annotate(
+                matched=Count('tag_id')
+            ).filter(matched=len(tag_ids))
+        return queryset.filter(id__in=recipe_tags.values('recipe_id'))
 
     def filter_favorite_or_cart(self, queryset, name, value):
         user = self.request.user
@@ -36,3 +95,14 @@ class RecipeFilter(FilterSet):
             elif name == 'is_in_shopping_cart':
                 return queryset.filter(recipe_shopping_lists__user=user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
+
+    def skip_filter(self, queryset, name, value):
+        # Параметр применяется вместе с другими: в filter_queryset или
+        # filter_tags.
+        return queryset
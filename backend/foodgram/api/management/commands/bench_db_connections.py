@@ -0,0 +1,105 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from foodgram.db.pool import close_pool, get_pool_stats
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+MODES = {
+    'new': {
+        'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'POOL': None},
+    'persistent': {
+        'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False, 'POOL': None},
+    'persistent+checks': {
+        'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'POOL': None},
+    'pool': {
+        'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True,
+        'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 4, 'TIMEOUT': 10}},
+}
+
+
+def start_response(status, headers):
+    pass
+
+
+class Command(BaseCommand):
+    help = '''Measure per-request latency through the WSGI handler with a
+    new database connection per request, persistent connections with and
+    without health checks and the in-process pool'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument(
+            '--path', default='/api/users/me/',
+            help='Authenticated GET endpoint to request')
+        parser.add_argument(
+            '--modes', default=','.join(MODES),
+            help='Comma-separated modes to compare')
+
+    def measure(self, handler, factory, token, path):
+        request = factory.get(
+            path, HTTP_HOST=self.host, HTTP_AUTHORIZATION=f'Token {token}')
+        started = time.perf_counter()
+        response = handler(request.environ, start_response)
+        b''.join(response)
+        response.close()
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise CommandError(f'{path}: {response.status_code}')
+        return elapsed
+
+    def handle(self, *args, **options):
+        modes = options['modes'].split(',')
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+        if connection.vendor != 'postgresql':
+            self.stderr.write(
+                f'{connection.vendor} opens connections without network '
+                f'and authentication, the difference will be small')
+        user = User.objects.filter(is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No users, run generate_fake_data first')
+        token = Token.objects.get_or_create(user=user)[0].key
+        self.host = next((
+            host.lstrip('.') for host in settings.ALLOWED_HOSTS
+            if '*' not in host
+        ), 'localhost')
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        original = {key: connection.settings_dict.get(key) for key in (
+            'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'POOL')}
+        pool_key = connection.alias, connection.settings_dict['NAME']
+        baseline = None
+        try:
+            for mode in modes:
+                connection.close()
+                close_pool(pool_key)
+                connection.settings_dict.update(MODES[mode])
+                # Первый запрос открывает соединение и в замер не входит.
+                self.measure(handler, factory, token, options['path'])
+                timings = sorted(
+                    self.measure(handler, factory, token, options['path'])
+                    for _ in range(options['requests']))
+                cuts = statistics.quantiles(timings, n=100)
+                p50, p99 = cuts[49] * 1000, cuts[98] * 1000
+                if baseline is None:
+                    baseline = p50
+                self.stdout.write(
+                    f'{mode:<18} p50={p50:.2f}ms p99={p99:.2f}ms '
+                    f'saved={baseline - p50:.2f}ms')
+                stats = get_pool_stats().get(pool_key)
+                if stats:
+                    self.stdout.write(
+                        f'{"":<18} pool size={stats["size"]} '
+                        f'acquired={stats["acquired"]} '
+                        f'created={stats["created"]} waits={stats["waits"]}')
+        finally:
+            connection.close()
+            close_pool(pool_key)
+            connection.settings_dict.update(original)
@@ -0,0 +1,127 @@
+import base64
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+
+from api.parsers import RecipeJSONParser
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from drf_base64.fields import Base64ImageField
+from PIL import Image
+from rest_framework.parsers import JSONParser
+
+
+def legacy_upload(stream):
+    """Прежний путь: тело целиком в памяти, base64 декодируется разом."""
+    data = JSONParser().parse(stream)
+    return Base64ImageField().to_internal_value(data['image'])
+
+
+def streaming_upload(stream):
+    data = RecipeJSONParser().parse(stream)
+    return Base64ImageField().to_internal_value(data['image'])
+
+
+UPLOADS = {
+    'legacy': legacy_upload,
+    'streaming': streaming_upload,
+}
+
+
+def make_body(path, width, height, image_format):
+    image = Image.frombytes('RGB', (width, height), os.urandom(
+        width * height * 3))
+    with tempfile.TemporaryFile() as image_file:
+        image.save(image_file, image_format)
+        image_file.seek(0)
+        encoded = base64.b64encode(image_file.read()).decode()
+    body = json.dumps({
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'tags': [1],
+        'ingredients': [{'id': 1, 'amount': 10}],
+        'image': f'data:image/{image_format.lower()};base64,{encoded}',
+    })
+    with open(path, 'w') as body_file:
+        body_file.write(body)
+    return len(body)
+
+
+def read_status(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(f'{field}:'):
+                return int(line.split()[1]) * 1024
+
+
+def measure(name, path, results, max_upload_size):
+    # Выполняется в отдельном процессе; пик RSS сбрасывается через
+    # clear_refs, чтобы не учитывать память родителя (Linux).
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    rss_before = read_status('VmRSS')
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=max_upload_size):
+            with open(path, 'rb') as stream:
+                image = UPLOADS[name](stream)
+    except Exception as error:
+        results.put(f'{type(error).__name__}: {error}')
+        return
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rss_peak = read_status('VmHWM')
+    results.put((elapsed, peak, rss_peak - rss_before, image.size))
+
+
+class Command(BaseCommand):
+    help = '''Compare peak memory of a base64 recipe image upload before and
+    after streaming decoding'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+        parser.add_argument(
+            '--format', choices=('JPEG', 'PNG', 'WEBP'), default='JPEG')
+        parser.add_argument(
+            '--max-upload-size',
+            type=int,
+            default=settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE,
+            help='RECIPE_IMAGE_MAX_UPLOAD_SIZE for the streaming parser',
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'body.json')
+            size = make_body(
+                path, options['width'], options['height'], options['format'])
+            self.stdout.write(
+                f'{options["width"]}x{options["height"]} {options["format"]} '
+                f'body={size / 2 ** 20:.1f}MiB'
+            )
+            for name in UPLOADS:
+                results = context.Queue()
+                process = context.Process(
+                    target=measure,
+                    args=(name, path, results, options['max_upload_size']),
+                )
+                process.start()
+                result = results.get()
+                process.join()
+                if isinstance(result, str):
+                    raise CommandError(f'{name}: {result}')
+                elapsed, peak, rss, image_size = result
+                self.stdout.write(
+                    f'{name:<10} time={elapsed * 1000:.1f}ms '
+                    f'peak={peak / 2 ** 20:.1f}MiB '
+                    f'rss_growth={rss / 2 ** 20:.1f}MiB '
+                    f'image={image_size / 2 ** 20:.1f}MiB'
+                )
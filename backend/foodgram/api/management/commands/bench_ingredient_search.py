@@ -0,0 +1,45 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+def percentiles(timings):
+    cuts = statistics.quantiles(timings, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+class Command(BaseCommand):
+    help = '''Compare p50/p99 latency of ingredient prefix search in the
+    database and in the in-memory index'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('No ingredients, run import_csv_data first')
+        generator = random.Random(options['seed'])
+        prefixes = []
+        for _ in range(options['queries']):
+            name = generator.choice(names)
+            prefixes.append(name[:generator.randint(1, min(len(name), 6))])
+        ingredient_index.search('')
+        searches = (
+            ('database', lambda prefix: list(
+                Ingredient.objects.filter(name__istartswith=prefix))),
+            ('index', ingredient_index.search),
+        )
+        for name, search in searches:
+            timings = []
+            for prefix in prefixes:
+                started = time.perf_counter()
+                search(prefix)
+                timings.append(time.perf_counter() - started)
+            p50, p99 = percentiles(timings)
+            self.stdout.write(f'{name:<9} p50={p50:.3f}ms p99={p99:.3f}ms')
@@ -0,0 +1,311 @@
+import base64
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from io import BytesIO
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler,
+                                          get_internal_wsgi_application)
+from PIL import Image
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+DEFAULT_MIX = (
+    'feed=35,feed_tags=15,detail=20,autocomplete=15,favorite=5,cart=5,'
+    'download=3,create=2'
+)
+ACTIONS = (
+    'feed', 'feed_tags', 'detail', 'autocomplete', 'favorite', 'cart',
+    'download', 'create',
+)
+SAMPLE_SIZE = 10000
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in ACTIONS:
+            raise CommandError(
+                f'Unknown action {name!r}, choose from {", ".join(ACTIONS)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    index = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def tiny_image():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), 'orange').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class SimulatedUser:
+    """Один пользователь со своей сессией и состоянием избранного."""
+
+    def __init__(self, bench, token, seed):
+        self.bench = bench
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.token = token
+        self.in_favorites = set()
+        self.in_cart = set()
+
+    def headers(self, anonymous=False):
+        if anonymous or self.token is None:
+            return {}
+        return {'Authorization': f'Token {self.token}'}
+
+    def read_headers(self):
+        return self.headers(self.rng.random() < self.bench.anonymous)
+
+    def recipe_id(self):
+        # Популярные рецепты запрашиваются чаще.
+        recipe_ids = self.bench.recipe_ids
+        rank = int(self.rng.paretovariate(1.2)) - 1
+        return recipe_ids[min(rank, len(recipe_ids) - 1)]
+
+    def feed(self):
+        page = min(int(self.rng.expovariate(0.5)) + 1, 50)
+        return 'GET', f'/api/recipes/?page={page}&limit=6', None, \
+            self.read_headers()
+
+    def feed_tags(self):
+        tags = self.rng.sample(
+            self.bench.tag_slugs, min(2, len(self.bench.tag_slugs)))
+        query = '&'.join(f'tags={slug}' for slug in tags)
+        return 'GET', f'/api/recipes/?{query}&limit=6', None, \
+            self.read_headers()
+
+    def detail(self):
+        return 'GET', f'/api/recipes/{self.recipe_id()}/', None, \
+            self.read_headers()
+
+    def autocomplete(self):
+        name = self.rng.choice(self.bench.ingredient_names)
+        prefix = name[:self.rng.randint(1, min(4, len(name)))]
+        return 'GET', '/api/ingredients/', {'name': prefix}, \
+            self.read_headers()
+
+    def toggle(self, path, chosen):
+        recipe_id = self.recipe_id()
+        if recipe_id in chosen:
+            chosen.discard(recipe_id)
+            method = 'DELETE'
+        else:
+            chosen.add(recipe_id)
+            method = 'POST'
+        return method, f'/api/recipes/{recipe_id}/{path}/', None, \
+            self.headers()
+
+    def favorite(self):
+        return self.toggle('favorite', self.in_favorites)
+
+    def cart(self):
+        return self.toggle('shopping_cart', self.in_cart)
+
+    def download(self):
+        return 'GET', '/api/recipes/download_shopping_cart/', None, \
+            self.headers()
+
+    def create(self):
+        ingredient_ids = self.rng.sample(self.bench.ingredient_ids, 5)
+        return 'POST', '/api/recipes/', {
+            'name': 'Нагрузочный рецепт',
+            'text': 'Создан bench_load.',
+            'cooking_time': self.rng.randint(5, 120),
+            'tags': self.rng.sample(self.bench.tag_ids, 1),
+            'image': self.bench.image,
+            'ingredients': [
+                {'id': ingredient_id, 'amount': self.rng.randint(1, 500)}
+                for ingredient_id in ingredient_ids
+            ],
+        }, self.headers()
+
+    def request(self, action):
+        method, path, data, headers = getattr(self, action)()
+        url = self.bench.base_url + path
+        started = time.perf_counter()
+        try:
+            if method == 'GET':
+                response = self.session.get(
+                    url, params=data, headers=headers, timeout=30)
+            else:
+                response = self.session.request(
+                    method, url, json=data, headers=headers, timeout=30)
+            response.content
+            status = response.status_code
+        except requests.RequestException as error:
+            status = type(error).__name__
+        return time.perf_counter() - started, status
+
+
+class Command(BaseCommand):
+    help = '''Replay a weighted traffic mix against the API with concurrent
+    simulated users and report latency percentiles as JSON'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server; by default a threaded '
+                 'server is started in this process')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--warmup', type=float, default=3)
+        parser.add_argument('--mix', default=DEFAULT_MIX, type=parse_mix)
+        parser.add_argument(
+            '--anonymous', type=float, default=0.5,
+            help='Share of read requests sent without a token')
+        parser.add_argument(
+            '--users', type=int, default=200,
+            help='Existing users to authenticate as')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON report here')
+
+    def load_fixture(self, users):
+        self.recipe_ids = list(
+            Recipe.objects.order_by('-id').values_list(
+                'id', flat=True)[:SAMPLE_SIZE])
+        random.Random(self.seed).shuffle(self.recipe_ids)
+        ingredients = list(
+            Ingredient.objects.values_list('id', 'name')[:SAMPLE_SIZE])
+        tags = list(Tag.objects.values_list('id', 'slug'))
+        if not self.recipe_ids or len(ingredients) < 5 or not tags:
+            raise CommandError(
+                'Not enough data, run generate_fake_data first')
+        self.ingredient_ids = [id for id, _ in ingredients]
+        self.ingredient_names = [name for _, name in ingredients]
+        self.tag_ids = [id for id, _ in tags]
+        self.tag_slugs = [slug for _, slug in tags]
+        self.tokens = [
+            Token.objects.get_or_create(user=user)[0].key
+            for user in User.objects.filter(
+                is_active=True, is_staff=False
+            ).order_by('id')[:users]
+        ]
+        self.image = tiny_image()
+
+    def start_server(self):
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(get_internal_wsgi_application())
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server, f'http://127.0.0.1:{server.server_port}'
+
+    def run_user(self, user, actions, weights, started, deadline):
+        while True:
+            action = user.rng.choices(actions, weights)[0]
+            elapsed, status = user.request(action)
+            now = time.perf_counter()
+            if now > deadline:
+                return
+            if now - elapsed >= started:
+                with self.lock:
+                    self.timings[action].append(elapsed)
+                    self.statuses[action][str(status)] += 1
+
+    def get_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, options, elapsed):
+        endpoints = {}
+        errors = 0
+        for action, timings in sorted(self.timings.items()):
+            timings.sort()
+            statuses = self.statuses[action]
+            # 4xx у переключателей — ожидаемый ответ на повтор, не ошибка.
+            failed = sum(
+                count for status, count in statuses.items()
+                if not status.isdigit() or int(status) >= 500
+            )
+            errors += failed
+            endpoints[action] = {
+                'requests': len(timings),
+                'errors': failed,
+                'statuses': dict(sorted(statuses.items())),
+                'rps': round(len(timings) / elapsed, 1),
+                'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+                'max_ms': round(timings[-1] * 1000, 2),
+            }
+        total = sum(len(timings) for timings in self.timings.values())
+        return {
+            'commit': self.get_commit(),
+            'url': options['url'] or 'in-process',
+            'concurrency': options['concurrency'],
+            'duration_s': round(elapsed, 1),
+            'mix': options['mix'],
+            'requests': total,
+            'errors': errors,
+            'rps': round(total / elapsed, 1),
+            'endpoints': endpoints,
+        }
+
+    def handle(self, *args, **options):
+        self.seed = options['seed']
+        self.anonymous = options['anonymous']
+        self.load_fixture(options['users'])
+        server = None
+        if options['url']:
+            self.base_url = options['url'].rstrip('/')
+        else:
+            server, self.base_url = self.start_server()
+        self.timings = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+        actions = list(options['mix'])
+        weights = [options['mix'][action] for action in actions]
+        users = [
+            SimulatedUser(
+                self,
+                self.tokens[index % len(self.tokens)] if self.tokens else None,
+                self.seed + index,
+            ) for index in range(options['concurrency'])
+        ]
+        started = time.perf_counter() + options['warmup']
+        deadline = started + options['duration']
+        threads = [
+            threading.Thread(
+                target=self.run_user,
+                args=(user, actions, weights, started, deadline))
+            for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if server is not None:
+            server.shutdown()
+        report = json.dumps(
+            self.report(options, options['duration']),
+            ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        self.stdout.write(report)
@@ -0,0 +1,96 @@
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from api.pagination import RecipeCursorPagination
+from api.views import RecipeViewSet
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Recipe
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIRequestFactory
+from users.models import User
+
+SEED_BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = '''Compare the latency of deep recipe feed pages with page number
+    and cursor pagination'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', default='1,10,100,1000,10000')
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--seed-recipes',
+            type=int,
+            default=0,
+            help='Create this many synthetic recipes before measuring',
+        )
+
+    def seed(self, count):
+        author, _ = User.objects.get_or_create(
+            username='bench_author',
+            defaults={'email': 'bench_author@example.com'},
+        )
+        for start in range(0, count, SEED_BATCH_SIZE):
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name=f'Рецепт {number}',
+                    image='recipes/image/bench.png',
+                    text='Описание',
+                    cooking_time=number % 120 + 1,
+                )
+                for number in range(start, min(start + SEED_BATCH_SIZE, count))
+            )
+
+    def cursor_url(self, limit, page):
+        paginator = RecipeCursorPagination()
+        paginator.base_url = (
+            f'http://{self.host}/api/recipes/?pagination=cursor&limit={limit}')
+        position = None
+        if page > 1:
+            position = str(Recipe.objects.order_by(
+                '-pub_date', '-id'
+            ).values_list('pub_date', flat=True)[(page - 1) * limit - 1])
+        url = urlsplit(paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)))
+        return f'{url.path}?{url.query}'
+
+    def measure(self, url, repeat):
+        view = RecipeViewSet.as_view({'get': 'list'})
+        timings = []
+        for _ in range(repeat):
+            request = self.factory.get(url, HTTP_HOST=self.host)
+            started = time.perf_counter()
+            response = view(request)
+            response.render()
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: {response.status_code}')
+        return statistics.median(timings) * 1000
+
+    def handle(self, *args, **options):
+        if options['seed_recipes']:
+            self.seed(options['seed_recipes'])
+        self.factory = APIRequestFactory()
+        self.host = next((
+            host.lstrip('.') for host in settings.ALLOWED_HOSTS
+            if '*' not in host
+        ), 'localhost')
+        limit = options['limit']
+        total = Recipe.objects.count()
+        self.stdout.write(f'recipes={total} limit={limit}')
+        for page in map(int, options['pages'].split(',')):
+            if (page - 1) * limit >= total:
+                break
+            page_number = self.measure(
+                f'/api/recipes/?page={page}&limit={limit}', options['repeat'])
+            cursor = self.measure(
+                self.cursor_url(limit, page), options['repeat'])
+            self.stdout.write(
+                f'page={page:<7} page_number={page_number:.1f}ms '
+                f'cursor={cursor:.1f}ms'
+            )
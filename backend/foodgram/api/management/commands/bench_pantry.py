@@ -0,0 +1,74 @@
+import random
+import statistics
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Q
+from recipes.models import Recipe, RecipeIngredient
+from recipes.pantry_index import filter_recipe_ids, pantry_index
+
+
+def percentiles(timings):
+    cuts = statistics.quantiles(timings, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+class Command(BaseCommand):
+    help = '''Compare p50/p99 latency of "cook from my pantry" queries with
+    joins through RecipeIngredient and with the in-memory inverted index'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--pantry-size', type=int, default=20)
+        parser.add_argument('--max-missing', type=int, default=1)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def join(self, pantry, max_missing, limit):
+        queryset = Recipe.objects.annotate(
+            total=Count('ingredient_list__ingredient', distinct=True),
+            have=Count(
+                'ingredient_list__ingredient',
+                filter=Q(ingredient_list__ingredient__in=pantry),
+                distinct=True,
+            ),
+        ).filter(have__gt=0, total__lte=F('have') + max_missing)
+        queryset.count()
+        list(queryset.order_by('-pub_date', '-id')[:limit])
+
+    def index(self, pantry, max_missing, limit):
+        recipe_ids = pantry_index.cookable(pantry, (), max_missing)
+        queryset = filter_recipe_ids(Recipe.objects.all(), recipe_ids)
+        queryset.count()
+        list(queryset.order_by('-pub_date', '-id')[:limit])
+
+    def handle(self, *args, **options):
+        popular = [
+            ingredient_id for ingredient_id, _ in Counter(
+                RecipeIngredient.objects.values_list(
+                    'ingredient_id', flat=True).iterator()
+            ).most_common(options['pantry_size'] * 5)
+        ]
+        if len(popular) < options['pantry_size']:
+            raise CommandError(
+                'Not enough ingredients in recipes, run generate_fake_data '
+                'first')
+        generator = random.Random(options['seed'])
+        pantries = [
+            generator.sample(popular, options['pantry_size'])
+            for _ in range(options['queries'])
+        ]
+        started = time.perf_counter()
+        pantry_index.containing(())
+        self.stdout.write(
+            f'recipes={Recipe.objects.count()} '
+            f'index build={time.perf_counter() - started:.2f}s')
+        for name, search in (('join', self.join), ('index', self.index)):
+            timings = []
+            for pantry in pantries:
+                started = time.perf_counter()
+                search(pantry, options['max_missing'], options['limit'])
+                timings.append(time.perf_counter() - started)
+            p50, p99 = percentiles(timings)
+            self.stdout.write(f'{name:<6} p50={p50:.1f}ms p99={p99:.1f}ms')
@@ -0,0 +1,116 @@
+import random
+import statistics
+import time
+from urllib.parse import urlencode
+
+from api.views import RecipeViewSet
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.test import APIRequestFactory
+
+
+def percentiles(timings):
+    cuts = statistics.quantiles(timings, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+class Command(BaseCommand):
+    help = '''Measure p50/p99 latency of recipe full-text search through
+    the feed endpoint and compare it with an icontains scan'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--budget-ms', type=float,
+            help='Fail if p99 of indexed search exceeds this')
+        parser.add_argument(
+            '--skip-scan', action='store_true',
+            help='Do not measure the icontains baseline')
+
+    def get_words(self):
+        words = [
+            word for name in Ingredient.objects.values_list(
+                'name', flat=True)[:5000]
+            for word in name.split() if len(word) > 3
+        ]
+        words += [
+            word for name in Recipe.objects.order_by('-id').values_list(
+                'name', flat=True)[:1000]
+            for word in name.split() if word.isalpha()
+        ]
+        if not words:
+            raise CommandError(
+                'No recipes or ingredients, run generate_fake_data first')
+        return words
+
+    def measure(self, params):
+        # Повторы запросов не должны попадать в кэш ответов.
+        cache.clear()
+        view = RecipeViewSet.as_view({'get': 'list'})
+        request = self.factory.get(
+            f'/api/recipes/?{urlencode(params, doseq=True)}',
+            HTTP_HOST=self.host)
+        started = time.perf_counter()
+        response = view(request)
+        response.render()
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise CommandError(f'{params}: {response.status_code}')
+        return elapsed
+
+    def measure_scan(self, text, limit):
+        started = time.perf_counter()
+        queryset = Recipe.objects.filter(
+            Q(name__icontains=text) | Q(text__icontains=text))
+        queryset.count()
+        list(queryset.order_by('-pub_date', '-id')[:limit])
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        self.factory = APIRequestFactory()
+        self.host = next((
+            host.lstrip('.') for host in settings.ALLOWED_HOSTS
+            if '*' not in host
+        ), 'localhost')
+        words = self.get_words()
+        tags = list(Tag.objects.values_list('slug', flat=True))
+        limit = options['limit']
+        cases = {'one word': [], 'two words': [], 'with tag': []}
+        for _ in range(options['queries']):
+            cases['one word'].append({'search': generator.choice(words)})
+            cases['two words'].append(
+                {'search': ' '.join(generator.sample(words, 2))})
+            if tags:
+                cases['with tag'].append({
+                    'search': generator.choice(words),
+                    'tags': generator.choice(tags),
+                })
+        self.stdout.write(f'recipes={Recipe.objects.count()} limit={limit}')
+        worst = 0
+        for name, queries in cases.items():
+            if not queries:
+                continue
+            timings = [
+                self.measure({**params, 'limit': limit}) for params in queries
+            ]
+            p50, p99 = percentiles(timings)
+            worst = max(worst, p99)
+            self.stdout.write(f'{name:<10} p50={p50:.1f}ms p99={p99:.1f}ms')
+        if not options['skip_scan']:
+            timings = [
+                self.measure_scan(params['search'], limit)
+                for params in cases['one word'][:20]
+            ]
+            p50, p99 = percentiles(timings)
+            self.stdout.write(f'{"icontains":<10} p50={p50:.1f}ms '
+                              f'p99={p99:.1f}ms')
+        budget = options['budget_ms']
+        if budget is not None and worst > budget:
+            raise CommandError(
+                f'p99 {worst:.1f}ms is over the {budget:.0f}ms budget')
@@ -0,0 +1,193 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_load import parse_mix
+
+MODES = ('wsgi', 'asgi')
+READ_MIX = 'feed=40,feed_tags=15,detail=25,autocomplete=15,download=5'
+STARTUP_TIMEOUT = 30
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SlowClients:
+    """Соединения, которые присылают заголовки запроса по строке в секунду.
+
+    Так ведут себя медленные клиенты без буферизующего прокси: каждое
+    соединение держит синхронный воркер, пока запрос не дочитан.
+    """
+
+    def __init__(self, url, count):
+        self.address = urlsplit(url).hostname, urlsplit(url).port
+        self.count = count
+        self.sockets = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.drip, daemon=True)
+
+    def __enter__(self):
+        for _ in range(self.count):
+            sock = socket.create_connection(self.address)
+            sock.sendall(b'GET /api/tags/ HTTP/1.1\r\nHost: localhost\r\n')
+            self.sockets.append(sock)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+        for sock in self.sockets:
+            sock.close()
+
+    def drip(self):
+        while not self.stopped.wait(1):
+            for sock in self.sockets:
+                try:
+                    sock.sendall(b'X-Slow: 1\r\n')
+                except OSError:
+                    pass
+
+
+class Command(BaseCommand):
+    help = '''Start gunicorn in WSGI and ASGI mode with the same number of
+    workers, replay bench_load at growing concurrency against each and
+    report the highest concurrency that stays within the p99 budget'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes', default=','.join(MODES),
+            help='Comma-separated server modes to compare')
+        parser.add_argument(
+            '--concurrency', default='4,16,64,128',
+            help='Comma-separated numbers of concurrent connections')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=15)
+        parser.add_argument('--warmup', type=float, default=2)
+        parser.add_argument('--mix', default=READ_MIX, type=parse_mix)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Connections that send headers slowly during each run')
+        parser.add_argument('--budget-ms', type=float, default=500)
+        parser.add_argument('--output', help='Write the JSON report here')
+
+    def start_server(self, mode, workers):
+        port = free_port()
+        url = f'http://127.0.0.1:{port}'
+        env = {
+            **os.environ,
+            'SERVER_MODE': mode,
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'GUNICORN_WORKERS': str(workers),
+            'GUNICORN_TIMEOUT': '120',
+        }
+        self.cache_dir = None
+        if not os.getenv('CACHE_BACKEND'):
+            # Воркерам нужен общий кэш версий, а memcached рядом с
+            # замером может не быть: файловый кэш общий для процессов.
+            self.cache_dir = tempfile.mkdtemp(prefix='foodgram-cache-')
+            env.update(CACHE_BACKEND=FILE_CACHE, CACHE_LOCATION=self.cache_dir)
+        # Лог в файл, а не в pipe: заполненный pipe остановит сервер.
+        log = tempfile.TemporaryFile()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn'], cwd=settings.BASE_DIR,
+            env=env, stdout=subprocess.DEVNULL, stderr=log)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                self.remove_cache()
+                raise CommandError(
+                    f'{mode} server exited: {log.read().decode()}')
+            try:
+                # Первый запрос к воркеру импортирует приложение.
+                requests.get(f'{url}/api/tags/', timeout=STARTUP_TIMEOUT)
+                return server, url
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        server.kill()
+        server.wait()
+        self.remove_cache()
+        raise CommandError(f'{mode} server did not start on {url}')
+
+    def remove_cache(self):
+        if self.cache_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def run_load(self, url, concurrency, options):
+        output = StringIO()
+        call_command(
+            'bench_load', url=url, concurrency=concurrency,
+            duration=options['duration'], warmup=options['warmup'],
+            mix=options['mix'], stdout=output)
+        report = json.loads(output.getvalue())
+        timings = [
+            endpoint['p99_ms'] for endpoint in report['endpoints'].values()
+        ]
+        return {
+            'concurrency': concurrency,
+            'requests': report['requests'],
+            'rps': report['rps'],
+            'errors': report['errors'],
+            'p99_ms': max(timings, default=0),
+        }
+
+    def handle(self, *args, **options):
+        modes = options['modes'].split(',')
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+        levels = sorted(int(level)
+                        for level in options['concurrency'].split(','))
+        budget = options['budget_ms']
+        results = {}
+        for mode in modes:
+            server, url = self.start_server(mode, options['workers'])
+            try:
+                runs = []
+                for concurrency in levels:
+                    with SlowClients(url, options['slow_clients']):
+                        run = self.run_load(url, concurrency, options)
+                    runs.append(run)
+                    self.stdout.write(
+                        f'{mode} concurrency={concurrency:<4} '
+                        f'rps={run["rps"]:<8} p99={run["p99_ms"]}ms '
+                        f'errors={run["errors"]}')
+            finally:
+                server.terminate()
+                server.wait()
+                self.remove_cache()
+            capacity = max((
+                run['concurrency'] for run in runs
+                if run['requests'] and not run['errors']
+                and run['p99_ms'] <= budget
+            ), default=0)
+            results[mode] = {'capacity': capacity, 'runs': runs}
+            self.stdout.write(
+                f'{mode} capacity at p99<={budget:.0f}ms: {capacity}')
+        report = json.dumps({
+            'workers': options['workers'],
+            'slow_clients': options['slow_clients'],
+            'budget_ms': budget,
+            'modes': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
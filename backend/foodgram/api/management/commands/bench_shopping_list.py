@@ -0,0 +1,86 @@
+import time
+import tracemalloc
+
+from api.renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                           ShoppingListTextRenderer)
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse, StreamingHttpResponse
+
+RENDERERS = {
+    renderer.format: renderer for renderer in (
+        ShoppingListTextRenderer,
+        ShoppingListCSVRenderer,
+        ShoppingListJSONRenderer,
+    )
+}
+
+
+def fake_ingredients(rows):
+    for index in range(rows):
+        yield {
+            'ingredient__name': f'ингредиент {index}',
+            'ingredient__measurement_unit': 'г',
+            'amount': index % 1000 + 1,
+        }
+
+
+def legacy_response(ingredients):
+    """Прежняя реализация: весь список собирается в памяти."""
+    shopping_list = 'Список покупок:'
+    for ingredient in ingredients:
+        shopping_list += (
+            f"\n{ingredient['ingredient__name']} "
+            f"({ingredient['ingredient__measurement_unit']}) - "
+            f"{ingredient['amount']}")
+    return HttpResponse(shopping_list, content_type='text/plain')
+
+
+def streaming_response(ingredients, renderer):
+    return StreamingHttpResponse(
+        renderer.stream(ingredients),
+        content_type=f'{renderer.media_type}; charset={renderer.charset}'
+    )
+
+
+def measure(build_response):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = build_response()
+    chunks = iter(response)
+    size = len(next(chunks))
+    first_byte = time.perf_counter() - started
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte, total, peak, size
+
+
+class Command(BaseCommand):
+    help = '''Compare peak memory and time to first byte of the shopping
+    list download before and after streaming'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument(
+            '--format', choices=sorted(RENDERERS), default='txt')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        renderer = RENDERERS[options['format']]()
+        results = (
+            # Прежний QuerySet кэшировал все строки, поэтому список.
+            ('legacy', lambda: legacy_response(
+                list(fake_ingredients(rows)))),
+            ('streaming', lambda: streaming_response(
+                fake_ingredients(rows), renderer)),
+        )
+        self.stdout.write(f'rows={rows} format={renderer.format}')
+        for name, build_response in results:
+            first_byte, total, peak, size = measure(build_response)
+            self.stdout.write(
+                f'{name:<10} ttfb={first_byte * 1000:.1f}ms '
+                f'total={total * 1000:.1f}ms '
+                f'peak={peak / 2 ** 20:.1f}MiB size={size / 2 ** 20:.1f}MiB'
+            )
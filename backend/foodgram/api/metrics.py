@@ -0,0 +1,156 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from foodgram.db.pool import get_pool_stats
+
+from .authentication import auth_cache_stats
+from .cache import cache_stats
+
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+POOL_EVENTS = ('acquired', 'created', 'closed', 'waits', 'timeouts')
+HISTOGRAMS = (
+    ('foodgram_request_duration_seconds',
+     'Total time spent handling the request', DURATION_BUCKETS),
+    ('foodgram_db_duration_seconds',
+     'Time spent in SQL queries', DURATION_BUCKETS),
+    ('foodgram_view_duration_seconds',
+     'Time spent in the view and serializers outside SQL', DURATION_BUCKETS),
+    ('foodgram_render_duration_seconds',
+     'Time spent rendering the response', DURATION_BUCKETS),
+    ('foodgram_db_queries',
+     'SQL queries per request', QUERY_BUCKETS),
+)
+
+
+class Histogram:
+    """Кумулятивная гистограмма Prometheus с фиксированными границами."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines = []
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        lines.append(f'{name}_sum{{{labels}}} {round(self.sum, 6)}')
+        lines.append(f'{name}_count{{{labels}}} {total}')
+        return lines
+
+
+class Registry:
+    """Метрики запросов в памяти процесса.
+
+    Каждый воркер копит свои значения, поэтому при нескольких процессах
+    Prometheus видит метрики того воркера, который ответил на запрос.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {
+            name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+            for name, _, buckets in HISTOGRAMS
+        }
+        self.responses = defaultdict(int)
+
+    def observe(self, view, status, total, db, view_time, render, queries):
+        with self.lock:
+            histograms = self.histograms
+            histograms['foodgram_request_duration_seconds'][view].observe(
+                total)
+            histograms['foodgram_db_duration_seconds'][view].observe(db)
+            histograms['foodgram_view_duration_seconds'][view].observe(
+                view_time)
+            histograms['foodgram_render_duration_seconds'][view].observe(
+                render)
+            histograms['foodgram_db_queries'][view].observe(queries)
+            self.responses[view, f'{status // 100}xx'] += 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, description, _ in HISTOGRAMS:
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in sorted(self.histograms[name].items()):
+                    lines.extend(histogram.render(name, f'view="{view}"'))
+            lines.append(
+                '# HELP foodgram_responses_total Sampled responses by status')
+            lines.append('# TYPE foodgram_responses_total counter')
+            for (view, status), count in sorted(self.responses.items()):
+                lines.append(
+                    f'foodgram_responses_total{{view="{view}",'
+                    f'status="{status}"}} {count}')
+        lines.append(
+            '# HELP foodgram_response_cache_total Anonymous response cache '
+            'lookups')
+        lines.append('# TYPE foodgram_response_cache_total counter')
+        for result, count in sorted(cache_stats.items()):
+            lines.append(
+                f'foodgram_response_cache_total{{result="{result}"}} {count}')
+        lines.append(
+            '# HELP foodgram_auth_cache_total Token authentication cache '
+            'lookups')
+        lines.append('# TYPE foodgram_auth_cache_total counter')
+        for result, count in sorted(auth_cache_stats.items()):
+            lines.append(
+                f'foodgram_auth_cache_total{{result="{result}"}} {count}')
+        lines.extend(self.render_pools())
+        return '\n'.join(lines) + '\n'
+
+    def render_pools(self):
+        pools = sorted(get_pool_stats().items())
+        if not pools:
+            return []
+        lines = [
+            '# HELP foodgram_db_pool_connections Connections of the '
+            'in-process database pool',
+            '# TYPE foodgram_db_pool_connections gauge',
+        ]
+        for (alias, database), stats in pools:
+            labels = f'alias="{alias}",database="{database}"'
+            for state in ('idle', 'in_use'):
+                lines.append(f'foodgram_db_pool_connections{{{labels},'
+                             f'state="{state}"}} {stats[state]}')
+        lines.append('# HELP foodgram_db_pool_max_connections Pool size '
+                     'limit')
+        lines.append('# TYPE foodgram_db_pool_max_connections gauge')
+        for (alias, database), stats in pools:
+            lines.append(
+                f'foodgram_db_pool_max_connections{{alias="{alias}",'
+                f'database="{database}"}} {stats["max_size"]}')
+        lines.append('# HELP foodgram_db_pool_events_total Pool '
+                     'acquisitions, opened and closed connections, waits '
+                     'and timeouts')
+        lines.append('# TYPE foodgram_db_pool_events_total counter')
+        for (alias, database), stats in pools:
+            for event in POOL_EVENTS:
+                lines.append(
+                    f'foodgram_db_pool_events_total{{alias="{alias}",'
+                    f'database="{database}",event="{event}"}} '
+                    f'{stats[event]}')
+        lines.append('# HELP foodgram_db_pool_wait_seconds_total Time spent '
+                     'waiting for a free connection')
+        lines.append('# TYPE foodgram_db_pool_wait_seconds_total counter')
+        for (alias, database), stats in pools:
+            lines.append(
+                f'foodgram_db_pool_wait_seconds_total{{alias="{alias}",'
+                f'database="{database}"}} {round(stats["wait_seconds"], 6)}')
+        return lines
+
+
+registry = Registry()
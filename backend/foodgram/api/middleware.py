@@ -0,0 +1,163 @@
+import asyncio
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import registry
+
+
+def get_view_name(view_func, method):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class RequestTiming:
+    """Считает SQL-запросы и их время через connection.execute_wrapper."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = 'unmatched'
+        self.view_started = None
+        self.view_finished = None
+        self.queries = 0
+        self.db_time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+class TimedStream:
+    """Содержимое потокового ответа, которое считает запросы к БД.
+
+    Каждая часть читается под execute_wrapper замера, по окончании или
+    закрытии потока вызывается on_finish. Django регистрирует close()
+    как закрывающий ресурс ответа, поэтому он вызывается и для
+    недочитанного потока.
+    """
+
+    def __init__(self, content, timing, on_finish):
+        self.content = iter(content)
+        self.timing = timing
+        self.on_finish = on_finish
+        self.finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            with connection.execute_wrapper(self.timing):
+                return next(self.content)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        if not self.finished:
+            self.finished = True
+            self.on_finish()
+
+
+class RequestMetricsMiddleware:
+    """Время SQL, view, отрисовки и всего запроса для каждого view.
+
+    Значения попадают в гистограммы api.metrics и, если включено
+    METRICS_SERVER_TIMING, в заголовок Server-Timing. Замеряется доля
+    запросов METRICS_SAMPLE_RATE, остальные проходят без накладных
+    расходов. Отрисовка отделяется от view через
+    process_template_response, поэтому для ответов без render всё время
+    относится к view. Потоковые ответы обращаются к БД, пока тело
+    отдаётся клиенту, поэтому их запросы считает TimedStream, а метрики
+    записываются, когда поток дочитан или закрыт; заголовок
+    Server-Timing им не добавляется, он уходит раньше тела.
+
+    Под ASGI запросы к БД выполняются не в потоке middleware: их
+    считают асинхронные view из api.async_views, у остальных view
+    учитывается только время.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Django проверяет middleware так же, как MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timing = self.start(request)
+        if timing is None:
+            return self.get_response(request)
+        with connection.execute_wrapper(timing):
+            response = self.get_response(request)
+        return self.finish(timing, response)
+
+    async def __acall__(self, request):
+        timing = self.start(request)
+        response = await self.get_response(request)
+        if timing is None:
+            return response
+        return self.finish(timing, response)
+
+    def start(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None
+        timing = request._timing = RequestTiming()
+        return timing
+
+    def finish(self, timing, response):
+        if response.streaming:
+            response.streaming_content = TimedStream(
+                response.streaming_content, timing,
+                lambda: self.observe(timing, response))
+            return response
+        server_timing = self.observe(timing, response)
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = server_timing
+        return response
+
+    def observe(self, timing, response):
+        finished = time.perf_counter()
+        view_started = timing.view_started or timing.started
+        view_finished = timing.view_finished or finished
+        total = finished - timing.started
+        render = finished - view_finished
+        view_time = max(view_finished - view_started - timing.db_time, 0)
+        registry.observe(
+            timing.view, response.status_code, total, timing.db_time,
+            view_time, render, timing.queries,
+        )
+        return (
+            f'db;dur={timing.db_time * 1000:.1f};'
+            f'desc="{timing.queries} queries", '
+            f'view;dur={view_time * 1000:.1f}, '
+            f'render;dur={render * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, '_timing', None)
+        if timing is not None:
+            timing.view = get_view_name(view_func, request.method.lower())
+            timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, '_timing', None)
+        if timing is not None and timing.view_finished is None:
+            timing.view_finished = time.perf_counter()
+        return response
@@ -1,6 +1,46 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+    cursor_pagination_class = None
+
+    def use_cursor(self, request):
+        return self.cursor_pagination_class is not None and (
+            'cursor' in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size = CustomPagination.page_size
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class UserCursorPagination(CursorPagination):
+    page_size = CustomPagination.page_size
+    page_size_query_param = 'limit'
+    ordering = ('username',)
+
+
+class RecipePagination(CustomPagination):
+    cursor_pagination_class = RecipeCursorPagination
+
+
+class UserPagination(CustomPagination):
+    cursor_pagination_class = UserCursorPagination
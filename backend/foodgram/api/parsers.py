@@ -0,0 +1,278 @@
+import binascii
+import json
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils.datastructures import MultiValueDict
+from PIL import ImageFile
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import JSONParser
+
+READ_SIZE = 64 * 1024
+MAX_HEADER_SIZE = 256
+MAX_SNIFF_SIZE = 1024 * 1024
+IMAGE_PLACEHOLDER = '__streamed_image__'
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+WHITESPACE = b' \t\r\n'
+
+
+class Base64ImageWriter:
+    """Декодирует base64 по частям во временный файл.
+
+    По первым байтам определяет формат и размеры изображения и
+    отклоняет неподходящие файлы, не дожидаясь конца тела запроса.
+    """
+
+    def __init__(self, content_type):
+        self.content_type = content_type
+        self.file = TemporaryUploadedFile(
+            'image', content_type, 0, None)
+        self.pending = b''
+        self.size = 0
+        self.sniffer = ImageFile.Parser()
+        self.image_format = None
+
+    def error(self, message):
+        self.file.close()
+        return ValidationError({'image': [message]})
+
+    def write(self, data):
+        data = self.pending + data.translate(None, WHITESPACE)
+        usable = len(data) - len(data) % 4
+        self.pending = data[usable:]
+        if usable:
+            try:
+                self.write_decoded(binascii.a2b_base64(data[:usable]))
+            except binascii.Error:
+                raise self.error('Некорректная строка base64!')
+
+    def write_decoded(self, data):
+        self.size += len(data)
+        if self.size > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+            raise self.error('Файл изображения слишком большой!')
+        if self.image_format is None:
+            self.sniff(data)
+        self.file.write(data)
+
+    def sniff(self, data):
+        try:
+            self.sniffer.feed(data)
+        except Exception:
+            raise self.error('Загрузите корректное изображение!')
+        image = self.sniffer.image
+        if image is None:
+            if self.size > MAX_SNIFF_SIZE:
+                raise self.error('Загрузите корректное изображение!')
+            return
+        if image.format not in IMAGE_FORMATS:
+            raise self.error('Неподдерживаемый формат изображения!')
+        if max(image.size) > settings.RECIPE_IMAGE_MAX_SIDE:
+            raise self.error('Изображение слишком большого размера!')
+        self.image_format = image.format
+
+    def finish(self):
+        if self.pending:
+            try:
+                self.write_decoded(binascii.a2b_base64(self.pending))
+            except binascii.Error:
+                raise self.error('Некорректная строка base64!')
+        if self.image_format is None:
+            raise self.error('Загрузите корректное изображение!')
+        self.file.flush()
+        self.file.seek(0)
+        self.file.size = self.size
+        self.file.name = (
+            f'{uuid.uuid4()}.{IMAGE_FORMATS[self.image_format]}')
+        return self.file
+
+
+class RecipeJSONParser(JSONParser):
+    """Разбирает JSON рецепта, не держа фото в памяти целиком.
+
+    Значение ключа image верхнего уровня в виде data:...;base64,...
+    декодируется на лету во временный файл, остальное тело запроса
+    разбирается обычным json.loads.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if stream is None:
+            return None
+        scanner = ImageFieldScanner()
+        try:
+            while True:
+                chunk = stream.read(READ_SIZE)
+                if not chunk:
+                    break
+                scanner.feed(chunk)
+            try:
+                data = json.loads(scanner.finish().decode(encoding))
+            except ValueError as exc:
+                raise ParseError(f'JSON parse error - {exc}')
+        except Exception:
+            scanner.close()
+            raise
+        if (isinstance(data, dict) and scanner.image is not None
+                and data.get('image') == IMAGE_PLACEHOLDER):
+            data['image'] = scanner.image
+            # Как DRF делает для форм: Django закроет и удалит временный
+            # файл после ответа.
+            request = parser_context.get('request')
+            if request is not None:
+                request._request._files = MultiValueDict(
+                    {'image': [scanner.image]})
+        else:
+            # Последним значением image оказалось не изображение.
+            scanner.close()
+        return data
+
+
+class ImageFieldScanner:
+    """Копирует JSON без значения image и передаёт его в Base64ImageWriter.
+
+    Разбор ведётся посимвольно только вне значения image; само значение
+    обрабатывается поиском кавычки и экранирования в каждом блоке.
+    """
+
+    def __init__(self):
+        self.rest = bytearray()
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_string = None
+        self.key = None
+        self.after_colon = False
+        self.header = None
+        self.writer = None
+        self.value_escape = False
+        self.image = None
+
+    def feed(self, chunk):
+        position = 0
+        while position < len(chunk):
+            if self.header is not None or self.writer is not None:
+                position = self.feed_image(chunk, position)
+            else:
+                position = self.feed_json(chunk, position)
+
+    def feed_json(self, chunk, position):
+        for index in range(position, len(chunk)):
+            byte = chunk[index:index + 1]
+            if self.in_string:
+                self.rest += byte
+                if self.escape:
+                    self.escape = False
+                elif byte == b'\\':
+                    self.escape = True
+                elif byte == b'"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self.last_string = bytes(
+                            self.rest[self.string_start:-1])
+                continue
+            if byte == b'"':
+                self.rest += byte
+                if (self.depth == 1 and self.after_colon
+                        and self.key == b'image'):
+                    # При повторе ключа json.loads оставит последнее
+                    # значение, поэтому прежний файл больше не нужен.
+                    self.close()
+                    self.header = b''
+                    self.after_colon = False
+                    return index + 1
+                self.in_string = True
+                self.string_start = len(self.rest)
+            else:
+                self.rest += byte
+                if byte in b'{[':
+                    self.depth += 1
+                elif byte in b'}]':
+                    self.depth -= 1
+                elif byte == b':' and self.depth == 1:
+                    self.key = self.last_string
+                    self.after_colon = True
+                    continue
+                elif byte in WHITESPACE:
+                    continue
+            self.after_colon = False
+        return len(chunk)
+
+    def feed_image(self, chunk, position):
+        if self.writer is None:
+            return self.feed_header(chunk, position)
+        if self.value_escape:
+            self.value_escape = False
+            escaped = chunk[position:position + 1]
+            if escaped == b'/':
+                self.writer.write(b'/')
+            elif escaped not in b'nrt':
+                raise ValidationError(
+                    {'image': ['Некорректная строка base64!']})
+            return position + 1
+        end = len(chunk)
+        for special in (b'"', b'\\'):
+            found = chunk.find(special, position, end)
+            if found != -1:
+                end = found
+        self.writer.write(chunk[position:end])
+        if end == len(chunk):
+            return end
+        if chunk[end:end + 1] == b'\\':
+            self.value_escape = True
+            return end + 1
+        self.image = self.writer.finish()
+        self.writer = None
+        self.rest += IMAGE_PLACEHOLDER.encode() + b'"'
+        return end + 1
+
+    def feed_header(self, chunk, position):
+        end = chunk.find(b'"', position)
+        if end == -1:
+            end = len(chunk)
+        self.header += chunk[position:end]
+        if not b'data:'.startswith(self.header[:5]):
+            return self.give_up_header(end)
+        separator = self.header.find(b';base64,')
+        if separator == -1:
+            if end < len(chunk) or len(self.header) > MAX_HEADER_SIZE:
+                return self.give_up_header(end)
+            return end
+        content_type = self.header[5:separator].decode('ascii', 'replace')
+        data = self.header[separator + len(b';base64,'):]
+        self.header = None
+        self.writer = Base64ImageWriter(content_type)
+        position = 0
+        while position < len(data):
+            position = self.feed_image(data, position)
+        return end
+
+    def give_up_header(self, position):
+        """Значение не похоже на data URI: разбираем его как обычную строку."""
+        header, self.header = self.header, None
+        self.in_string = True
+        self.string_start = len(self.rest)
+        self.key = None
+        self.feed_json(header, 0)
+        return position
+
+    def finish(self):
+        if self.header is not None or self.writer is not None:
+            raise ParseError('JSON parse error - unterminated image string')
+        return bytes(self.rest)
+
+    def close(self):
+        """Закрывает временные файлы, которые не попадут в данные запроса."""
+        if self.writer is not None:
+            self.writer.file.close()
+            self.writer = None
+        if self.image is not None:
+            self.image.close()
+            self.image = None
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+CHUNK_SIZE = 500
+
+
+def chunked(lines, size=CHUNK_SIZE):
+    """Склеивает строки в блоки, чтобы не отдавать ответ по одной строке."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+class ShoppingListTextRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data).encode(self.charset)
+
+    def stream(self, ingredients):
+        yield 'Список покупок:'
+        yield from chunked(
+            f"\n{ingredient['ingredient__name']} "
+            f"({ingredient['ingredient__measurement_unit']}) - "
+            f"{ingredient['amount']}"
+            for ingredient in ingredients
+        )
+
+
+class ShoppingListCSVRenderer(ShoppingListTextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def write_row(row):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(row)
+            return buffer.getvalue()
+
+        yield write_row(('name', 'measurement_unit', 'amount'))
+        yield from chunked(
+            write_row((ingredient['ingredient__name'],
+                       ingredient['ingredient__measurement_unit'],
+                       ingredient['amount']))
+            for ingredient in ingredients
+        )
+
+
+class ShoppingListJSONRenderer(JSONRenderer):
+    charset = 'utf-8'
+
+    def stream(self, ingredients):
+        yield '['
+        yield from chunked(
+            (',' if index else '') + json.dumps({
+                'name': ingredient['ingredient__name'],
+                'measurement_unit': ingredient['ingredient__measurement_unit'],
+                'amount': ingredient['amount'],
+            }, ensure_ascii=False)
+            for index, ingredient in enumerate(ingredients)
+        )
+        yield ']'
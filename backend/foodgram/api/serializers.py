@@ -2,11 +2,16 @@ import djoser.serializers
 from django.contrib.auth import password_validation
 from django.db import transaction
 from drf_base64.fields import Base64ImageField
+from recipes.counters import change_counter
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
                             RecipeIngredient, ShoppingList, Tag)
+from recipes.shopping_cart import (get_amounts_delta,
+                                   update_shopping_cart_totals)
 from rest_framework import exceptions, serializers
 from rest_framework.exceptions import ValidationError
-from users.models import Subscription, User
+from users.models import User
+
+from .utils import get_recipes_limit, get_subscribed_ids
 
 
 class UserSerializer(djoser.serializers.UserSerializer):
@@ -19,10 +24,11 @@ class UserSerializer(djoser.serializers.UserSerializer):
                   'first_name', 'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and not request.user.is_anonymous:
-            return Subscription.objects.filter(
-                user=request.user, author=obj).exists()
+            return obj.id in get_subscribed_ids(request)
         return False
 
 
@@ -59,14 +65,13 @@ class ChangePasswordSerializer(serializers.Serializer):
 
     def update(self, instance, validated_data):
         instance.set_password(validated_data['new_password'])
-        instance.save()
+        instance.save(update_fields=('password',))
 
         return validated_data
 
 
 class SubscriptionSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count',)
@@ -74,37 +79,67 @@ class SubscriptionSerializer(UserSerializer):
 
     def validate(self, data):
         author = self.instance
-        user = self.context.get('request').user
-        if Subscription.objects.filter(user=user, author=author).exists():
+        request = self.context.get('request')
+        user = request.user
+        if author.id in get_subscribed_ids(request):
             raise exceptions.ValidationError(
                 'Вы уже подписаны на этого пользователя!')
         if user == author:
             raise exceptions.ValidationError(
                 'Нельзя подписаться на самого себя!'
             )
+        get_recipes_limit(request)
         return data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'recent_recipes'):
+            recipes = obj.recent_recipes
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = obj.recipes.all()
+            if limit is not None:
+                recipes = recipes[:limit]
         serializer = ShowRecipeAddedSerializer(recipes,
                                                many=True,
                                                read_only=True)
         return serializer.data
 
 
+class ImageVariantField(serializers.Field):
+    """Ссылка на уменьшенную копию фото рецепта.
+
+    Пока копия не создана, отдаётся ссылка на исходное фото.
+    """
+
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        name = recipe.image.name
+        variants = recipe.image_variants
+        if variants.get('source') == name and self.variant in variants:
+            name = variants[self.variant]
+        url = recipe.image.storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
 class ShowRecipeAddedSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    # Карточкам избранного, списка покупок и подписок хватает
+    # маленькой копии фото.
+    image = ImageVariantField('small')
+    image_small = ImageVariantField('small')
+    image_medium = ImageVariantField('medium')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_small', 'image_medium',
+                  'cooking_time')
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -155,30 +190,43 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only=True
     )
     image = Base64ImageField()
+    image_small = ImageVariantField('small')
+    image_medium = ImageVariantField('medium')
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'author', 'name', 'image', 'text',
-                  'ingredients', 'tags', 'cooking_time',
-                  'is_favorited', 'is_in_shopping_cart')
+        fields = ('id', 'author', 'name', 'image', 'image_small',
+                  'image_medium', 'text', 'ingredients', 'tags',
+                  'cooking_time', 'is_favorited', 'is_in_shopping_cart',
+                  'favorites_count')
 
     def get_ingredients(self, obj):
         ingredients = RecipeIngredient.objects.filter(recipe=obj)
         return RecipeIngredientSerializer(ingredients, many=True).data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         return (obj.favorited_by.filter(user=user).exists()
                 if user.is_authenticated else False)
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         return (obj.recipe_shopping_lists.filter(user=user).exists()
                 if user.is_authenticated else False)
 
 
+class RecipeListSerializer(RecipeSerializer):
+    """Рецепт в ленте: вместо исходного фото отдаётся средняя копия."""
+
+    image = ImageVariantField('medium')
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField()
     author = UserSerializer(read_only=True)
@@ -224,6 +272,16 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Ингредиенты не могут повторяться!'
             )
+        unknown_ingredient_ids = unique_ingredient_id_list - set(
+            Ingredient.objects.filter(
+                id__in=unique_ingredient_id_list
+            ).values_list('id', flat=True)
+        )
+        if unknown_ingredient_ids:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: '
+                f'{", ".join(map(str, sorted(unknown_ingredient_ids)))}!'
+            )
         return obj
 
     @transaction.atomic
@@ -232,17 +290,57 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         RecipeIngredient.objects.bulk_create(
             [RecipeIngredient(
                 recipe=recipe,
-                ingredient=Ingredient.objects.get(pk=ingredient['id']),
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount']
             ) for ingredient in ingredients]
         )
 
+    @transaction.atomic
+    def updating_of_ingredients(self, recipe, ingredients):
+        new_amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        old_amounts = {}
+        existing = {}
+        to_delete = []
+        for recipe_ingredient in RecipeIngredient.objects.filter(
+            recipe=recipe
+        ):
+            ingredient_id = recipe_ingredient.ingredient_id
+            old_amounts[ingredient_id] = (
+                old_amounts.get(ingredient_id, 0) + recipe_ingredient.amount)
+            if (ingredient_id in existing
+                    or ingredient_id not in new_amounts):
+                to_delete.append(recipe_ingredient.id)
+            else:
+                existing[ingredient_id] = recipe_ingredient
+        to_update = []
+        for ingredient_id, recipe_ingredient in existing.items():
+            if recipe_ingredient.amount != new_amounts[ingredient_id]:
+                recipe_ingredient.amount = new_amounts[ingredient_id]
+                to_update.append(recipe_ingredient)
+        if to_delete:
+            RecipeIngredient.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amount
+            ) for ingredient_id, amount in new_amounts.items()
+                if ingredient_id not in existing]
+        )
+        return get_amounts_delta(old_amounts, new_amounts)
+
     @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(author=self.context['request'].user,
-                                       **validated_data)
+        author = self.context['request'].user
+        recipe = Recipe.objects.create(author=author, **validated_data)
+        change_counter(User, author.id, 'recipes_count', 1)
         self.creating_of_tags_and_ingredients(recipe, tags, ingredients)
         return recipe
 
@@ -250,17 +348,24 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        instance.tags.clear()
         instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.creating_of_tags_and_ingredients(instance, tags, ingredients)
-        return super().update(instance, validated_data)
+        update_shopping_cart_totals(
+            instance.recipe_shopping_lists.values_list('user_id', flat=True),
+            self.updating_of_ingredients(instance, ingredients)
+        )
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=(*validated_data, 'updated_at'))
+        return instance
 
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = FavoriteRecipe
         fields = ('user', 'recipe')
+        extra_kwargs = {
+            'recipe': {'queryset': Recipe.objects.defer('search_vector')},
+        }
 
     def validate(self, data):
         user = self.context['request'].user
@@ -281,6 +386,9 @@ class ShoppingListSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingList
         fields = ('user', 'recipe')
+        extra_kwargs = {
+            'recipe': {'queryset': Recipe.objects.defer('search_vector')},
+        }
 
     def validate(self, data):
         user = self.context['request'].user
@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .authentication import invalidate_token
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    # Выход через djoser удаляет токен. После удаления key обнуляется,
+    # поэтому значение запоминается сразу.
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_token(key))
+
+
+def invalidate_user_tokens(user_id):
+    for key in Token.objects.filter(
+        user_id=user_id
+    ).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, created, update_fields=None, **kwargs):
+    # Смена пароля, деактивация и любое другое изменение пользователя.
+    # У нового пользователя ещё нет токенов, а вход меняет только
+    # last_login.
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    user_id = instance.id
+    transaction.on_commit(lambda: invalidate_user_tokens(user_id))
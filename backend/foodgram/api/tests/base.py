@@ -0,0 +1,123 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from api.authentication import local_cache
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+from recipes.counters import COUNTERS, rebuild_counters
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingList, Tag)
+from recipes.search import rebuild_search_index
+from recipes.shopping_cart import rebuild_shopping_cart_totals
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from users.models import Subscription, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PASSWORD = 'Foodgram-pass-123'
+
+
+def png():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'orange').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def recipe_data(test):
+    return {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 15,
+        'tags': [tag.id for tag in test.tags[:3]],
+        'image': 'data:image/png;base64,' + base64.b64encode(png()).decode(),
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 10}
+            for ingredient in test.ingredients[:8]
+        ],
+    }
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_WORKERS=0)
+class FixtureTestCase(APITestCase):
+    """Общая фикстура: читатель, десяток авторов, их рецепты и подписки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        image = default_storage.save(
+            'recipes/image/fixture.png', ContentFile(png()))
+        # bulk_create в SQLite не возвращает id, поэтому create.
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {index}', color=f'#0000{index:02d}',
+                               slug=f'tag-{index}')
+            for index in range(8)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {index}', measurement_unit='г')
+            for index in range(120)
+        ]
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password=PASSWORD,
+            first_name='Читатель', last_name='Тестовый')
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author{index}', email=f'author{index}@example.com',
+                password=PASSWORD, first_name='Автор', last_name=str(index))
+            for index in range(12)
+        ]
+        cls.recipes = []
+        for index in range(48):
+            recipe = Recipe.objects.create(
+                author=cls.authors[index % len(cls.authors)],
+                name=f'Рецепт {index}', text='Описание', image=image,
+                cooking_time=index % 90 + 1,
+            )
+            recipe.tags.set(cls.tags[index % 3:index % 3 + 3])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=cls.ingredients[(index * 7 + offset) % 120],
+                    amount=offset + 1,
+                ) for offset in range(6)
+            )
+            cls.recipes.append(recipe)
+        cls.own_recipe = Recipe.objects.create(
+            author=cls.user, name='Свой рецепт', text='Описание',
+            image=image, cooking_time=10)
+        cls.own_recipe.tags.set(cls.tags[:2])
+        for author in cls.authors[:-1]:
+            Subscription.objects.create(user=cls.user, author=author)
+        for index, recipe in enumerate(cls.recipes[:-1]):
+            if index % 2 == 0:
+                FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+            if index % 3 == 0:
+                ShoppingList.objects.create(user=cls.user, recipe=recipe)
+            FavoriteRecipe.objects.create(
+                user=cls.authors[index % len(cls.authors)], recipe=recipe)
+        for counter in COUNTERS:
+            rebuild_counters(*counter)
+        rebuild_shopping_cart_totals([cls.user.id])
+        rebuild_search_index()
+        cls.token = Token.objects.create(user=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Кэши переживают откат транзакции теста. Без очистки версий
+        # индексы в памяти держат id фикстуры прошлого класса.
+        cache.clear()
+        local_cache.clear()
+
+    def get_client(self, user):
+        client = APIClient()
+        if user == 'auth':
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return client
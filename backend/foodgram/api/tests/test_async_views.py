@@ -0,0 +1,64 @@
+from unittest import mock
+
+from api import async_views
+from api.urls import router_v1
+from asgiref.sync import async_to_sync
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from .base import FixtureTestCase
+
+
+class AsyncViewsTest(FixtureTestCase):
+    """Асинхронные обёртки над view чтения для ASGI."""
+
+    def test_async_views(self):
+        urls = async_views.offload_routes(router_v1.urls)
+        self.assertEqual([url.name for url in urls],
+                         [url.name for url in router_v1.urls])
+        views = {url.name: url.callback for url in urls}
+        self.assertTrue(views['recipes-list'].csrf_exempt)
+        factory = APIRequestFactory()
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+        async def fetch(view, request):
+            response = await view(request)
+            # ASGIHandler в Django 3.2 перебирает ответ в цикле событий,
+            # запрос к БД здесь вызвал бы SynchronousOnlyOperation.
+            return response.status_code, b''.join(response)
+
+        # Данные тестовой SQLite видны только соединению основного потока.
+        with override_settings(ASYNC_VIEWS_THREAD_SENSITIVE=True):
+            status, content = async_to_sync(fetch)(
+                views['recipes-list'],
+                factory.get('/api/recipes/', {'limit': 3}, **headers))
+            self.assertEqual(status, 200)
+            self.assertEqual(content, self.get_client('auth').get(
+                reverse('recipes-list'), {'limit': 3}).content)
+            status, content = async_to_sync(fetch)(
+                views['recipes-download-shopping-cart'],
+                factory.get('/api/recipes/download_shopping_cart/',
+                            **headers))
+        self.assertEqual(status, 200)
+        self.assertEqual(content.decode().count('\n'),
+                         self.user.shopping_cart_ingredients.count())
+
+    def test_writes_stay_thread_sensitive(self):
+        factory = APIRequestFactory()
+        calls = []
+
+        def sync_to_async(func, thread_sensitive):
+            calls.append(thread_sensitive)
+
+            async def call(*args, **kwargs):
+                return None
+            return call
+
+        view = async_views.offload(lambda request: None)
+        with mock.patch.object(async_views, 'sync_to_async', sync_to_async):
+            for method in ('get', 'head', 'post', 'patch', 'delete'):
+                async_to_sync(view)(getattr(factory, method)('/'))
+            with override_settings(ASYNC_VIEWS_THREAD_SENSITIVE=True):
+                async_to_sync(view)(factory.get('/'))
+        self.assertEqual(calls, [False, False, True, True, True, True])
@@ -0,0 +1,97 @@
+from api.authentication import (CachedTokenAuthentication, auth_cache_stats,
+                                get_token_cache_keys, local_cache)
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .base import PASSWORD, FixtureTestCase
+
+
+class TokenCacheTest(FixtureTestCase):
+    """Кэш токенов и его сброс при выходе и изменении пользователя."""
+
+    def count_queries(self, client, status=200):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get(reverse('users-me')).status_code,
+                             status)
+        return len(queries)
+
+    def test_token_cache(self):
+        for backend in ('default', 'local'):
+            with self.subTest(backend=backend), \
+                    override_settings(AUTH_TOKEN_CACHE=backend):
+                author = User.objects.create_user(
+                    username=f'cached-{backend}', password=PASSWORD,
+                    email=f'cached-{backend}@example.com')
+                client = self.get_client('anon')
+                client.credentials(HTTP_AUTHORIZATION='Token ' + (
+                    Token.objects.create(user=author).key))
+                hits = auth_cache_stats['hits']
+                miss = self.count_queries(client)
+                self.assertEqual(self.count_queries(client), miss - 1)
+                self.assertEqual(auth_cache_stats['hits'], hits + 1)
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = client.post(
+                        reverse('users-change-password'),
+                        {'current_password': PASSWORD,
+                         'new_password': PASSWORD + '!'})
+                self.assertEqual(response.status_code, 204)
+                self.assertEqual(self.count_queries(client), miss)
+                author.is_active = False
+                with self.captureOnCommitCallbacks(execute=True):
+                    author.save(update_fields=('is_active',))
+                self.count_queries(client, 401)
+                author.is_active = True
+                with self.captureOnCommitCallbacks(execute=True):
+                    author.save(update_fields=('is_active',))
+                self.count_queries(client)
+                with self.captureOnCommitCallbacks(execute=True):
+                    client.post(reverse('logout'))
+                self.count_queries(client, 401)
+
+    @override_settings(AUTH_TOKEN_CACHE='local')
+    def test_invalidation_from_other_process(self):
+        client = self.get_client('auth')
+        miss = self.count_queries(client)
+        self.assertEqual(self.count_queries(client), miss - 1)
+        # Другой воркер удалил токен: до этого процесса доходит только
+        # сброс версии токена в общем кэше, локальная запись остаётся.
+        Token.objects.filter(pk=self.token.pk).delete()
+        cache.delete(get_token_cache_keys(self.token.key)[1])
+        self.assertEqual(len(local_cache.data), 1)
+        self.count_queries(client, 401)
+
+    def test_invalidation_is_per_user(self):
+        client = self.get_client('auth')
+        other = self.get_client('anon')
+        other.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(
+            user=self.authors[0]).key)
+        for each in (client, other):
+            self.count_queries(each)
+        miss = self.count_queries(client) + 1
+        author = self.authors[0]
+        author.first_name = 'Другое'
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+        self.assertEqual(self.count_queries(client), miss - 1)
+        self.assertEqual(self.count_queries(other), miss)
+
+    def test_cached_user(self):
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(self.token.key)
+        cached = cache.get(get_token_cache_keys(self.token.key)[0])
+        self.assertNotIn(self.user.password, str(cached))
+        with CaptureQueriesContext(connection) as queries:
+            user, token = authentication.authenticate_credentials(
+                self.token.key)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual((user.id, user.username, token.user_id),
+                         (self.user.id, self.user.username, self.user.id))
+        self.assertEqual(user.get_deferred_fields(), {
+            'password', 'last_login', 'date_joined', 'recipes_count',
+            'followers_count'})
+        self.assertTrue(user.check_password(PASSWORD))
@@ -0,0 +1,184 @@
+import time
+from unittest import mock
+
+from api.cache import cache_stats
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes.models import ShoppingList, Tag
+from rest_framework.authtoken.models import Token
+
+from .base import FixtureTestCase
+
+
+class ConditionalGetTest(FixtureTestCase):
+    """ETag и ответ 304 для чтения рецептов, тегов и ингредиентов."""
+
+    def get(self, client, url, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return client.get(url, params, **headers)
+
+    def test_not_modified(self):
+        client = self.get_client('anon')
+        for url in (reverse('recipes-list'), reverse('tags-list'),
+                    reverse('ingredients-list'),
+                    reverse('recipes-detail', args=(self.recipes[0].id,))):
+            with self.subTest(url=url):
+                response = self.get(client, url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                self.assertRegex(etag, r'^"[0-9a-f]{32}"$')
+                for header in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+                    response = self.get(client, url, header)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.content, b'')
+                    self.assertEqual(response['ETag'], etag)
+                    self.assertIn('Authorization', response['Vary'])
+                response = self.get(client, url, '"other"')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_query(self):
+        client = self.get_client('anon')
+        url = reverse('recipes-list')
+        etag = self.get(client, url, limit=1)['ETag']
+        self.assertEqual(self.get(client, url, limit=1)['ETag'], etag)
+        self.assertNotEqual(self.get(client, url, limit=2)['ETag'], etag)
+        self.assertEqual(
+            self.get(client, url, etag, limit=2).status_code, 200)
+
+    def test_etag_changes_after_write(self):
+        client = self.get_client('anon')
+        tags = reverse('tags-list')
+        etag = self.get(client, tags)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Новый', color='#ABCDEF', slug='new')
+        response = self.get(client, tags, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), len(self.tags) + 1)
+
+        recipe = self.recipes[0]
+        detail = reverse('recipes-detail', args=(recipe.id,))
+        other = reverse('recipes-detail', args=(self.recipes[1].id,))
+        etag, other_etag = self.get(client, detail)['ETag'], self.get(
+            client, other)['ETag']
+        recipe.name = 'Переименованный рецепт'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save(update_fields=('name', 'updated_at'))
+        response = self.get(client, detail, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], recipe.name)
+        self.assertEqual(self.get(client, other, other_etag).status_code, 304)
+
+    def test_etag_per_user(self):
+        url = reverse('recipes-list')
+        reader = self.get_client('auth')
+        author = self.get_client('anon')
+        author.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(
+            user=self.authors[0]).key)
+        anon_etag = self.get(self.get_client('anon'), url)['ETag']
+        reader_etag = self.get(reader, url)['ETag']
+        author_etag = self.get(author, url)['ETag']
+        self.assertEqual(
+            len({anon_etag, reader_etag, author_etag}), 3)
+        self.assertEqual(self.get(reader, url, author_etag).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingList.objects.create(
+                user=self.user, recipe=self.recipes[-1])
+        response = self.get(reader, url, reader_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], reader_etag)
+        self.assertEqual(self.get(author, url, author_etag).status_code, 304)
+
+    def test_favorite_keeps_feed_cache(self):
+        client = self.get_client('anon')
+        url = reverse('recipes-list')
+        recipe = self.recipes[-1]
+        detail = reverse('recipes-detail', args=(recipe.id,))
+        for each in (url, detail):
+            client.get(each, {'limit': 2})
+        etag = self.get(client, url, limit=2)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_client('auth').post(
+                reverse('recipes-favorite', args=(recipe.id,)))
+        response = client.get(url, {'limit': 2})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.get(client, url, etag, limit=2).status_code, 304)
+        response = client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(
+            response.data['favorites_count'], recipe.favorited_by.count())
+        with mock.patch('api.views.time.time', return_value=time.time()
+                        + settings.API_CACHE_TIMEOUT):
+            self.assertEqual(
+                self.get(client, url, etag, limit=2).status_code, 200)
+
+
+class AnonymousCacheTest(FixtureTestCase):
+    """Кэш отрисованных ответов для анонимов и его сброс по областям."""
+
+    def test_hit_after_miss(self):
+        client = self.get_client('anon')
+        # ETag рецепта сверяется с updated_at и при попадании в кэш.
+        for url, budget in (
+            (reverse('recipes-list'), 0), (reverse('tags-list'), 0),
+            (reverse('ingredients-list'), 0),
+            (reverse('recipes-detail', args=(self.recipes[0].id,)), 1),
+        ):
+            with self.subTest(url=url):
+                hits, misses = cache_stats['hits'], cache_stats['misses']
+                first = client.get(url)
+                self.assertEqual(first['X-Cache'], 'MISS')
+                with CaptureQueriesContext(connection) as queries:
+                    second = client.get(url)
+                self.assertEqual(second['X-Cache'], 'HIT')
+                self.assertEqual(len(queries), budget)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(
+                    (cache_stats['hits'], cache_stats['misses']),
+                    (hits + 1, misses + 1))
+
+    def test_write_evicts_touched_scopes(self):
+        client = self.get_client('anon')
+        edited, other = self.recipes[:2]
+        urls = {
+            'list': reverse('recipes-list'),
+            'edited': reverse('recipes-detail', args=(edited.id,)),
+            'other': reverse('recipes-detail', args=(other.id,)),
+            'tags': reverse('tags-list'),
+            'ingredients': reverse('ingredients-list'),
+        }
+        for url in urls.values():
+            client.get(url)
+        edited.name = 'Переименованный рецепт'
+        with self.captureOnCommitCallbacks(execute=True):
+            edited.save(update_fields=('name', 'updated_at'))
+        expected = {'list': 'MISS', 'edited': 'MISS', 'other': 'HIT',
+                    'tags': 'HIT', 'ingredients': 'HIT'}
+        self.assertEqual(
+            {name: client.get(url)['X-Cache'] for name, url in urls.items()},
+            expected)
+        self.assertEqual(
+            client.get(urls['edited']).json()['name'], edited.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Новый', color='#ABCDEF', slug='new')
+        expected = {'list': 'MISS', 'edited': 'MISS', 'other': 'MISS',
+                    'tags': 'MISS', 'ingredients': 'HIT'}
+        self.assertEqual(
+            {name: client.get(url)['X-Cache'] for name, url in urls.items()},
+            expected)
+
+    def test_authenticated_bypass(self):
+        client = self.get_client('auth')
+        url = reverse('recipes-list')
+        self.get_client('anon').get(url)
+        hits, misses = cache_stats['hits'], cache_stats['misses']
+        for _ in range(2):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Cache', response)
+            self.assertIn('is_favorited', response.data['results'][0])
+        self.assertEqual(
+            (cache_stats['hits'], cache_stats['misses']), (hits, misses))
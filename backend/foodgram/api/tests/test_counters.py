@@ -0,0 +1,100 @@
+from api.serializers import RecipeCreateSerializer
+from django.urls import reverse
+from recipes.counters import change_counter
+from recipes.models import FavoriteRecipe, Recipe, ShoppingList
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+from users.models import Subscription, User
+
+from .base import PASSWORD, FixtureTestCase, recipe_data
+
+
+class CounterTest(FixtureTestCase):
+    """Счётчики не теряют изменения, сделанные после загрузки объекта."""
+
+    def assertCounters(self, author, recipe=None):
+        author.refresh_from_db()
+        self.assertEqual(author.followers_count,
+                         Subscription.objects.filter(author=author).count())
+        self.assertEqual(author.recipes_count, author.recipes.count())
+        if recipe is not None:
+            recipe.refresh_from_db()
+            self.assertEqual(
+                recipe.favorites_count,
+                FavoriteRecipe.objects.filter(recipe=recipe).count())
+            self.assertEqual(
+                recipe.in_carts_count,
+                ShoppingList.objects.filter(recipe=recipe).count())
+
+    def test_user_writes_keep_counters(self):
+        author = self.authors[-1]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(
+            user=author).key)
+        me = reverse('users-me')
+        for index, (method, url, data) in enumerate((
+            ('post', reverse('users-change-password'),
+             {'current_password': PASSWORD, 'new_password': PASSWORD + '1'}),
+            ('post', reverse('users-set-password'),
+             {'current_password': PASSWORD + '1',
+              'new_password': PASSWORD + '2',
+              're_new_password': PASSWORD + '2'}),
+            # Сериализатор current_user djoser сохраняет пользователя,
+            # даже если ни одно поле не изменилось.
+            ('patch', me, {'first_name': 'Иван'}),
+            ('put', me, {'email': author.email}),
+        )):
+            with self.subTest(url=url, method=method):
+                # Пользователь автора уже загружен: запрос его аутентифицирует.
+                self.assertEqual(client.get(me).status_code, 200)
+                follower = User.objects.create_user(
+                    username=f'follower{index}',
+                    email=f'follower{index}@example.com', password=PASSWORD)
+                Subscription.objects.create(user=follower, author=author)
+                change_counter(User, author.id, 'followers_count', 1)
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = getattr(client, method)(url, data,
+                                                       format='json')
+                self.assertIn(response.status_code, (200, 204))
+                self.assertCounters(author)
+        self.assertTrue(author.check_password(PASSWORD + '2'))
+
+    def test_recipe_update_keeps_counters(self):
+        recipe = Recipe.objects.get(pk=self.own_recipe.pk)
+        FavoriteRecipe.objects.create(user=self.authors[0], recipe=recipe)
+        change_counter(Recipe, recipe.id, 'favorites_count', 1)
+        ShoppingList.objects.create(user=self.authors[0], recipe=recipe)
+        change_counter(Recipe, recipe.id, 'in_carts_count', 1)
+        request = APIRequestFactory().patch('/')
+        request.user = self.user
+        serializer = RecipeCreateSerializer(
+            recipe, data=recipe_data(self), context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(recipe.name, recipe_data(self)['name'])
+        self.assertCounters(self.user, recipe)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_plain_save_keeps_counters(self):
+        author = User.objects.get(pk=self.authors[0].pk)
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        Subscription.objects.create(user=self.authors[1], author=author)
+        change_counter(User, author.id, 'followers_count', 1)
+        FavoriteRecipe.objects.create(user=self.authors[-1], recipe=recipe)
+        change_counter(Recipe, recipe.id, 'favorites_count', 1)
+        author.last_name = 'Другая'
+        author.save()
+        recipe.text = 'Новое описание'
+        recipe.save()
+        self.assertCounters(author, recipe)
+        self.assertEqual(author.last_name, 'Другая')
+        self.assertEqual(recipe.text, 'Новое описание')
+        # Отложенные поля не загружаются ради сохранения.
+        deferred = User.objects.only('id', 'first_name').get(pk=author.pk)
+        deferred.first_name = 'Отложенный'
+        deferred.save()
+        self.assertIn('last_name', deferred.get_deferred_fields())
+        author.refresh_from_db()
+        self.assertEqual(
+            (author.first_name, author.last_name), ('Отложенный', 'Другая'))
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+from foodgram.db.pool import ConnectionPool, PoolTimeout
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_INTRANS)
+
+
+class PooledConnection:
+    """Соединение psycopg2 в объёме, который нужен пулу."""
+
+    closed = 0
+
+    def __init__(self):
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Выдача, возврат и проверка соединений пула."""
+
+    def test_connection_pool(self):
+        pool = ConnectionPool(min_size=1, max_size=2, timeout=0.05)
+        first = pool.acquire(PooledConnection)
+        second = pool.acquire(PooledConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(PooledConnection)
+        second.status = TRANSACTION_STATUS_INTRANS
+        pool.release(second)
+        self.assertIs(pool.acquire(PooledConnection), second)
+        self.assertEqual(second.status, TRANSACTION_STATUS_IDLE)
+        first.closed = 1
+        pool.release(first)
+        stats = pool.get_stats()
+        self.assertEqual(
+            (stats['size'], stats['in_use'], stats['created'],
+             stats['closed'], stats['timeouts']),
+            (1, 1, 2, 1, 1))
+        checked = ConnectionPool(min_size=1, max_size=1, timeout=0.05,
+                                 check=lambda connection: False)
+        stale = checked.acquire(PooledConnection)
+        checked.release(stale)
+        self.assertIsNot(checked.acquire(PooledConnection), stale)
+        self.assertTrue(stale.closed)
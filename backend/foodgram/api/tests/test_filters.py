@@ -0,0 +1,254 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes import pantry_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.pantry_index import PantryIndex
+from recipes.versions import bump_versions
+
+from .base import FixtureTestCase, recipe_data
+
+
+class SearchTest(FixtureTestCase):
+    """Полнотекстовый поиск рецептов."""
+
+    def test_search(self):
+        client = self.get_client('auth')
+        data = recipe_data(self)
+        data['name'] = 'Борщ с пампушками'
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('recipes-list'), data, format='json')
+        for query, tag, count in (
+            ('борщ', None, 1),
+            ('пампушки ингредиент', 'tag-1', 1),
+            ('пампушки', 'tag-7', 0),
+            ('щи', None, 0),
+        ):
+            with self.subTest(query=query, tag=tag):
+                response = client.get(
+                    reverse('recipes-list'), {'search': query, 'tags': tag}
+                    if tag else {'search': query})
+                self.assertEqual(response.data['count'], count)
+                if count:
+                    self.assertEqual(
+                        response.data['results'][0]['name'], data['name'])
+
+    def test_search_vector_not_loaded(self):
+        client = self.get_client('auth')
+        recipe = self.recipes[-1]
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('recipes-list'))
+            client.get(reverse('recipes-detail', args=(recipe.id,)))
+            client.post(reverse('recipes-favorite', args=(recipe.id,)))
+            client.post(reverse('recipes-shopping-cart', args=(recipe.id,)))
+        self.assertEqual([query['sql'] for query in queries
+                          if 'search_vector' in query['sql']], [])
+        # Полный save() не перезаписывает вектор, пересчитанный после
+        # коммита, и уменьшенные копии фото.
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        recipe.text = 'Новое описание'
+        with CaptureQueriesContext(connection) as queries:
+            recipe.save()
+        update, = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertIn('"text"', update)
+        self.assertNotIn('search_vector', update)
+        self.assertNotIn('image_variants', update)
+
+
+class TagFilterTest(FixtureTestCase):
+    """Фильтр рецептов по slug тегов."""
+
+    def test_tag_filter(self):
+        client = self.get_client('anon')
+        slugs = ['tag-1', 'tag-2']
+        for mode, expected in (
+            ('any', Recipe.objects.filter(tags__slug__in=slugs).distinct()),
+            ('all', Recipe.objects.filter(tags__slug=slugs[0]).filter(
+                tags__slug=slugs[1])),
+        ):
+            with self.subTest(mode=mode):
+                response = client.get(reverse('recipes-list'), {
+                    'tags': slugs, 'tags_mode': mode, 'limit': 100})
+                ids = [recipe['id'] for recipe in response.data['results']]
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(set(ids), set(
+                    expected.values_list('id', flat=True)))
+        response = client.get(reverse('recipes-list'), {'tags': 'missing'})
+        self.assertEqual(response.status_code, 400)
+        # Соответствие slug -> id уже загружено: таблица тегов читается
+        # только для тегов рецептов на странице.
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('recipes-list'), {'tags': slugs, 'limit': 1})
+        self.assertEqual([
+            query['sql'] for query in queries
+            if '"recipes_tag"' in query['sql']
+            and '_prefetch_related_val' not in query['sql']
+        ], [])
+
+    def test_unknown_slug_reloads_tags(self):
+        client = self.get_client('anon')
+        client.get(reverse('recipes-list'), {'tags': 'tag-1'})
+        # Версия tags меняется после коммита; до неё другой процесс уже
+        # может прислать slug нового тега.
+        tag = Tag.objects.create(name='Новый', color='#ABCDEF', slug='new')
+        self.recipes[0].tags.add(tag)
+        response = client.get(reverse('recipes-list'), {'tags': 'new'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[0].id])
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('recipes-list'), {'tags': 'gone'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(queries), 1)
+
+
+class PantryTest(FixtureTestCase):
+    """Подбор рецептов по набору ингредиентов."""
+
+    def test_pantry(self):
+        client = self.get_client('auth')
+
+        def names(**params):
+            response = client.get(reverse('recipes-list'), params)
+            self.assertEqual(response.status_code, 200)
+            return {recipe['name'] for recipe in response.data['results']}
+
+        pantry = [ingredient.id for ingredient in self.ingredients[:6]]
+        self.assertEqual(
+            names(ingredients=','.join(map(str, pantry))), {'Рецепт 0'})
+        self.assertEqual(names(
+            ingredients=','.join(map(str, pantry[:5])), max_missing=1
+        ), {'Рецепт 0', 'Рецепт 17'})
+        self.assertEqual(names(
+            ingredients=','.join(map(str, pantry)),
+            exclude_ingredients=pantry[0]
+        ), set())
+        response = client.get(reverse('recipes-list'), {
+            'exclude_ingredients': f'{pantry[0]},{pantry[1]}'})
+        self.assertEqual(
+            response.data['count'],
+            Recipe.objects.exclude(
+                ingredient_list__ingredient__in=pantry[:2]).count()
+        )
+        data = recipe_data(self)
+        data['name'] = 'Из запасов'
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('recipes-list'), data, format='json')
+        self.assertEqual(names(ingredients=','.join(
+            str(ingredient['id']) for ingredient in data['ingredients'])
+        ), {'Рецепт 0', 'Из запасов'})
+
+    def test_pantry_small_recipes(self):
+        client = self.get_client('auth')
+        data = recipe_data(self)
+        data['name'] = 'Два ингредиента'
+        data['ingredients'] = [
+            {'id': ingredient.id, 'amount': 1}
+            for ingredient in self.ingredients[-2:]
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('recipes-list'), data, format='json')
+        pantry = ','.join(str(ingredient.id)
+                          for ingredient in self.ingredients[:6])
+        # В рецепте нет ни одного ингредиента из набора, но недостаёт
+        # всего двух.
+        for max_missing, expected in ((1, False), (2, True), (10, True)):
+            with self.subTest(max_missing=max_missing):
+                response = client.get(reverse('recipes-list'), {
+                    'ingredients': pantry, 'max_missing': max_missing,
+                    'limit': 100})
+                names = {recipe['name']
+                         for recipe in response.data['results']}
+                self.assertEqual(data['name'] in names, expected)
+        response = client.get(reverse('recipes-list'), {
+            'ingredients': pantry, 'max_missing': 2, 'limit': 100,
+            'exclude_ingredients': self.ingredients[-1].id})
+        self.assertNotIn(data['name'], {
+            recipe['name'] for recipe in response.data['results']})
+
+    def test_large_recipe_ids(self):
+        client = self.get_client('anon')
+        ingredient = self.ingredients[0]
+        client.get(reverse('recipes-list'), {'ingredients': ingredient.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                id=2 ** 40, author=self.user, name='Большой id',
+                text='Описание', image=self.recipes[0].image, cooking_time=5)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1)
+        for params in ({'ingredients': ingredient.id},
+                       {'ingredients': ingredient.id, 'max_missing': 1}):
+            with self.subTest(params=params):
+                response = client.get(reverse('recipes-list'), {
+                    **params, 'limit': 100})
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(recipe.id, [
+                    item['id'] for item in response.data['results']])
+        response = client.get(reverse('recipes-list'), {
+            'exclude_ingredients': ingredient.id, 'limit': 100})
+        self.assertNotIn(recipe.id, [
+            item['id'] for item in response.data['results']])
+        self.assertLess(len(pantry_index.pantry_index._counts), 100)
+
+
+class PantryIndexTest(FixtureTestCase):
+    """Догоняющее обновление индекса по записям других процессов."""
+
+    def create_recipe(self, ingredients):
+        # Запись другого процесса: индекс узнаёт о ней только по версии.
+        recipe = Recipe.objects.create(
+            author=self.user, name='Чужой рецепт', text='Описание',
+            image=self.recipes[0].image, cooking_time=5)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients)
+        bump_versions('recipes')
+        return recipe
+
+    def test_refresh(self):
+        index = PantryIndex()
+        first, second, third = self.ingredients[:3]
+        self.assertNotIn(self.own_recipe.id, index.containing([first.id]))
+        with mock.patch.object(index, '_build') as build:
+            recipe = self.create_recipe([first, second])
+            self.assertIn(recipe.id, index.containing([first.id]))
+            self.assertIn(recipe.id, index.cookable([first.id, second.id]))
+            self.assertNotIn(recipe.id, index.cookable([first.id]))
+
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient=first).delete()
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=third, amount=1)
+            recipe.save(update_fields=('updated_at',))
+            bump_versions('recipes')
+            self.assertNotIn(recipe.id, index.containing([first.id]))
+            self.assertIn(recipe.id, index.cookable([second.id, third.id]))
+            self.assertIn(recipe.id, index.cookable([], max_missing=2))
+            self.assertNotIn(recipe.id, index.cookable([], max_missing=1))
+        build.assert_not_called()
+
+    def test_rebuild(self):
+        index = PantryIndex()
+        index.containing([self.ingredients[0].id])
+        rebuild = mock.patch.object(index, '_build', wraps=index._build)
+        with mock.patch.object(pantry_index, 'MAX_INCREMENTAL', 0), \
+                rebuild as build:
+            recipe = self.create_recipe(self.ingredients[:1])
+            self.assertIn(
+                recipe.id, index.containing([self.ingredients[0].id]))
+        build.assert_called_once_with()
+        # Смена версии ingredients перестраивает индекс целиком.
+        ingredient = Ingredient.objects.create(
+            name='новый ингредиент', measurement_unit='г')
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=1)
+        bump_versions('ingredients')
+        with mock.patch.object(
+            index, '_refresh', side_effect=AssertionError
+        ):
+            self.assertEqual(
+                index.containing([ingredient.id]), {recipe.id})
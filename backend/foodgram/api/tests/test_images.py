@@ -0,0 +1,62 @@
+import base64
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+from .base import FixtureTestCase, recipe_data
+
+
+def jpeg_with_exif():
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'
+    # Поворот на 90°: после очистки он должен остаться в пикселях.
+    exif[0x0112] = 6
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), 'orange').save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class RecipeImageTest(FixtureTestCase):
+    """Очистка фото от метаданных и уменьшенные копии в карточках."""
+
+    def test_metadata_stripped(self):
+        client = self.get_client('auth')
+        data = recipe_data(self)
+        data['image'] = 'data:image/jpeg;base64,' + base64.b64encode(
+            jpeg_with_exif()).decode()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse('recipes-list'), data,
+                                   format='json')
+        self.assertEqual(response.status_code, 201)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+        with default_storage.open(recipe.image.name) as file:
+            image = Image.open(file)
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertEqual(image.size, (20, 40))
+        # Повторная обработка не перекодирует уже очищенное фото.
+        modified = default_storage.get_modified_time(recipe.image.name)
+        self.assertTrue(process_recipe_image(recipe.id, force=True))
+        self.assertEqual(
+            default_storage.get_modified_time(recipe.image.name), modified)
+
+    def test_cards_use_variants(self):
+        client = self.get_client('auth')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse('recipes-list'), recipe_data(self),
+                                   format='json')
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        variants = recipe.image_variants
+        response = client.get(reverse('recipes-list'), {'limit': 1})
+        card, = response.data['results']
+        self.assertEqual(card['id'], recipe.id)
+        self.assertTrue(card['image'].endswith(variants['medium']))
+        self.assertEqual(card['image'], card['image_medium'])
+        response = client.get(reverse('recipes-detail', args=(recipe.id,)))
+        self.assertTrue(response.data['image'].endswith(recipe.image.name))
+        response = client.post(reverse('recipes-favorite', args=(recipe.id,)))
+        self.assertTrue(response.data['image'].endswith(variants['small']))
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from recipes.management.commands import import_csv_data
+from recipes.management.commands.import_csv_data import read_json
+from recipes.models import Ingredient
+
+ROWS = [
+    {'name': 'мука, пшеничная', 'measurement_unit': 'г'},
+    {'name': 'скобки [] и {}', 'measurement_unit': 'шт.'},
+    {'name': 'кавычки "в названии"', 'measurement_unit': 'мл'},
+]
+
+
+class ReadJSONTest(SimpleTestCase):
+    """Потоковое чтение массива ингредиентов из JSON."""
+
+    def read(self, text, size):
+        with mock.patch.object(import_csv_data, 'READ_SIZE', size):
+            return list(read_json(StringIO(text)))
+
+    def test_split_across_reads(self):
+        text = ' \n' + json.dumps(ROWS, ensure_ascii=False, indent=2) + '\n'
+        expected = [(row['name'], row['measurement_unit']) for row in ROWS]
+        for size in (1, 2, 3, 7, 16, 64, len(text)):
+            with self.subTest(size=size):
+                self.assertEqual(self.read(text, size), expected)
+        self.assertEqual(self.read('[]', 1), [])
+
+    def test_invalid(self):
+        for text, message in (
+            (json.dumps(ROWS)[:-1], 'Unexpected end of JSON file'),
+            (json.dumps(ROWS)[:-5], 'Invalid JSON file'),
+            (json.dumps(ROWS[0]), 'JSON file must contain an array'),
+            ('', 'JSON file must contain an array'),
+        ):
+            for size in (3, 1024):
+                with self.subTest(text=text, size=size):
+                    with self.assertRaisesMessage(CommandError, message):
+                        self.read(text, size)
+
+
+class ImportCommandTest(TestCase):
+    """Импорт ингредиентов и подсчёт пропущенных повторов."""
+
+    def test_reimport(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ingredients.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(ROWS + ROWS[:1], file, ensure_ascii=False)
+            for inserted, skipped in ((3, 1), (0, 4)):
+                stdout = StringIO()
+                call_command('import_csv_data', path, '--batch-size', '2',
+                             stdout=stdout)
+                self.assertIn(
+                    f'Read 4 rows: inserted {inserted}, skipped {skipped}',
+                    stdout.getvalue())
+        self.assertEqual(Ingredient.objects.count(), len(ROWS))
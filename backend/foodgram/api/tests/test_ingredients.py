@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes.ingredient_index import IngredientIndex
+from recipes.models import Ingredient
+
+from .base import FixtureTestCase
+
+
+class IngredientSearchTest(FixtureTestCase):
+    """Поиск ингредиентов по префиксу из индекса в памяти."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.salt = [
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (
+                ('соль морская', 'г'), ('Сольянка', 'г'), ('Соль', 'г'),
+                ('солод', 'г'), ('СОЛЬ', 'щепотка'), ('фасоль', 'г'),
+            )
+        ]
+
+    def search(self, name, **params):
+        response = self.get_client('anon').get(
+            reverse('ingredients-list'), {'name': name, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['name'], item['measurement_unit'])
+                for item in response.json()]
+
+    def test_ranking(self):
+        # Точные совпадения без учёта регистра, затем короткие названия.
+        expected = [('Соль', 'г'), ('СОЛЬ', 'щепотка'), ('Сольянка', 'г'),
+                    ('соль морская', 'г')]
+        self.assertEqual(self.search('соль'), expected)
+        self.assertEqual(self.search('  СоЛь'), expected)
+        self.assertEqual(self.search('сол'), [
+            ('Соль', 'г'), ('СОЛЬ', 'щепотка'), ('солод', 'г'),
+            ('Сольянка', 'г'), ('соль морская', 'г')])
+        self.assertEqual(self.search('перец'), [])
+
+    def test_limit(self):
+        self.assertEqual(self.search('соль', limit=2),
+                         [('Соль', 'г'), ('СОЛЬ', 'щепотка')])
+        self.assertEqual(len(self.search('ингредиент', limit=5)), 5)
+        self.assertEqual(len(self.search('ингредиент')), 120)
+        for limit in ('0', '-1', 'abc'):
+            with self.subTest(limit=limit):
+                response = self.get_client('anon').get(
+                    reverse('ingredients-list'),
+                    {'name': 'соль', 'limit': limit})
+                self.assertEqual(response.status_code, 400)
+
+    def test_rebuild(self):
+        index = IngredientIndex()
+        self.assertEqual(
+            [ingredient.name for ingredient in index.search('солод')],
+            ['солод'])
+        with CaptureQueriesContext(connection) as queries:
+            index.search('соль')
+        self.assertEqual(len(queries), 0)
+        malt = self.salt[3]
+        malt.name = 'Солодовый экстракт'
+        with self.captureOnCommitCallbacks(execute=True):
+            malt.save()
+            Ingredient.objects.create(name='солёный огурец',
+                                      measurement_unit='шт.')
+        self.assertEqual(
+            [ingredient.name for ingredient in index.search('сол', 3)],
+            ['Соль', 'СОЛЬ', 'Сольянка'])
+        self.assertEqual(
+            [ingredient.name for ingredient in index.search('солод')],
+            ['Солодовый экстракт'])
+        self.assertEqual(
+            [ingredient.name for ingredient in index.search('солё')],
+            ['солёный огурец'])
+        with self.captureOnCommitCallbacks(execute=True):
+            malt.delete()
+        self.assertEqual(index.search('солод'), [])
@@ -0,0 +1,53 @@
+from api.metrics import registry
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .base import FixtureTestCase
+
+
+@override_settings(METRICS_SAMPLE_RATE=1, METRICS_SERVER_TIMING=True)
+class MetricsTest(FixtureTestCase):
+    """Server-Timing и экспорт метрик запросов."""
+
+    def test_metrics(self):
+        client = self.get_client('auth')
+        response = client.get(reverse('recipes-list'))
+        self.assertRegex(
+            response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", ')
+        self.user.is_staff = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=('is_staff',))
+        response = client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'foodgram_db_queries_count{view="RecipeViewSet.list"}',
+            response.content.decode())
+
+    def test_streaming_response(self):
+        client = self.get_client('auth')
+        url = reverse('recipes-download-shopping-cart')
+        histograms = registry.histograms
+        view = 'RecipeViewSet.download_shopping_cart'
+
+        def observed():
+            queries = histograms['foodgram_db_queries'][view]
+            return sum(queries.counts), queries.sum
+
+        count, queries = observed()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+            self.assertNotIn('Server-Timing', response)
+            # Список покупок читается из БД, пока отдаётся тело ответа.
+            self.assertEqual(observed(), (count, queries))
+            content = b''.join(response.streaming_content)
+        self.assertEqual(content.decode().count('\n'),
+                         self.user.shopping_cart_ingredients.count())
+        self.assertEqual(observed(), (count + 1, queries + len(captured)))
+        self.assertTrue(any(
+            'recipes_shoppingcartingredient' in query['sql']
+            for query in captured))
+        response = client.get(url)
+        response.close()
+        self.assertEqual(observed()[0], count + 2)
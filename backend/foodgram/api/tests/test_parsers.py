@@ -0,0 +1,160 @@
+import base64
+import json
+from io import BytesIO
+from unittest import mock
+
+from api import parsers
+from api.parsers import RecipeJSONParser
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ParseError, ValidationError
+
+from .base import png
+
+IMAGE = png()
+DATA_URI = 'data:image/png;base64,' + base64.b64encode(IMAGE).decode()
+
+
+class ChunkedStream(BytesIO):
+    """Поток, который отдаёт не больше size байт за чтение."""
+
+    def __init__(self, data, size):
+        super().__init__(data)
+        self.size = size
+
+    def read(self, size=-1):
+        return super().read(min(size, self.size))
+
+
+class RecordedFile(TemporaryUploadedFile):
+    created = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created.append(self)
+
+
+class RecipeJSONParserTest(SimpleTestCase):
+    """Потоковый разбор JSON рецепта с изображением в base64."""
+
+    def setUp(self):
+        RecordedFile.created = []
+        patcher = mock.patch.object(
+            parsers, 'TemporaryUploadedFile', RecordedFile)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def parse(self, body, size=parsers.READ_SIZE):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode()
+        return RecipeJSONParser().parse(ChunkedStream(body, size))
+
+    def assertImage(self, image, content=IMAGE):
+        self.assertFalse(image.closed)
+        self.assertEqual(image.read(), content)
+        self.assertEqual(image.size, len(content))
+        self.assertRegex(image.name, r'\.png$')
+
+    def assertAllClosed(self, keep=None):
+        self.assertTrue(all(
+            file.closed for file in RecordedFile.created if file is not keep))
+
+    def test_split_reads(self):
+        body = {
+            'name': 'Кавычки "image": \\ и é',
+            'image': DATA_URI,
+            'tags': [1, 2],
+            'ingredients': [{'id': 1, 'amount': 2}],
+        }
+        encodings = (
+            json.dumps(body).encode(),
+            json.dumps(body, ensure_ascii=False, indent=2).encode(),
+            # Экранированный слеш допустим и внутри base64.
+            json.dumps(body).replace('/', '\\/').encode(),
+        )
+        for raw in encodings:
+            for size in (1, 3, 7, 64, len(raw)):
+                with self.subTest(raw=raw[:40], size=size):
+                    data = self.parse(raw, size)
+                    self.assertImage(data.pop('image'))
+                    expected = json.loads(raw)
+                    del expected['image']
+                    self.assertEqual(data, expected)
+
+    def test_wrapped_base64(self):
+        # Переносы строк приходят в JSON экранированными как \n.
+        wrapped = 'data:image/png;base64,' + base64.encodebytes(
+            IMAGE).decode()
+        self.assertImage(self.parse({'image': wrapped}, 5)['image'])
+
+    def test_nested_image_keys(self):
+        body = {
+            'ingredients': [{'id': 1, 'image': DATA_URI}],
+            'author': {'image': 'x'},
+            'image': DATA_URI,
+        }
+        data = self.parse(body, 11)
+        self.assertImage(data['image'])
+        self.assertEqual(data['ingredients'], body['ingredients'])
+        self.assertEqual(data['author'], body['author'])
+        self.assertEqual(len(RecordedFile.created), 1)
+
+    def test_plain_values(self):
+        for value in ('http://example.com/image.png', 'not\\"data', '',
+                      'data:image/png', None, 7, ['data:'], {'a': 1}):
+            with self.subTest(value=value):
+                self.assertEqual(
+                    self.parse({'image': value, 'name': 'q'}, 4),
+                    {'image': value, 'name': 'q'})
+        self.assertEqual(RecordedFile.created, [])
+
+    def test_duplicate_image_key(self):
+        other = png()[:-1] + b'\0'
+        body = (f'{{"image": "{DATA_URI}", "image": "data:image/png;base64,'
+                f'{base64.b64encode(other).decode()}"}}').encode()
+        data = self.parse(body, 9)
+        self.assertImage(data['image'], other)
+        self.assertEqual(len(RecordedFile.created), 2)
+        self.assertAllClosed(keep=data['image'])
+        for last in ('null', '"http://example.com/image.png"'):
+            with self.subTest(last=last):
+                RecordedFile.created = []
+                data = self.parse(
+                    f'{{"image": "{DATA_URI}", "image": {last}}}'.encode())
+                self.assertEqual(data['image'], json.loads(last))
+                self.assertAllClosed()
+
+    def test_invalid_image(self):
+        for value, message in (
+            ('data:image/png;base64,AAAA$AAA', 'base64'),
+            ('data:image/png;base64,AAAAA', 'base64'),
+            ('data:image/png;base64,' + base64.b64encode(
+                b'not an image' * 10).decode(), 'корректное изображение'),
+            ('data:image/bmp;base64,' + base64.b64encode(
+                b'BM' + b'\0' * 64).decode(), 'корректное изображение'),
+            ('data:image/png;base64,' + base64.b64encode(
+                IMAGE).decode()[:-8] + '\\u0041', 'base64'),
+        ):
+            with self.subTest(value=value[:40]):
+                RecordedFile.created = []
+                with self.assertRaisesMessage(ValidationError, message):
+                    self.parse({'image': value}, 16)
+                self.assertAllClosed()
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=len(IMAGE) - 1)
+    def test_too_large(self):
+        with self.assertRaisesMessage(ValidationError, 'слишком большой'):
+            self.parse({'image': DATA_URI})
+        self.assertAllClosed()
+
+    def test_malformed_json(self):
+        for body in (
+            f'{{"image": "{DATA_URI}'.encode(),
+            f'{{"image": "{DATA_URI}", "name": }}'.encode(),
+            b'{"name": "q",',
+        ):
+            with self.subTest(body=body[-20:]):
+                RecordedFile.created = []
+                with self.assertRaises(ParseError):
+                    self.parse(body, 10)
+                self.assertAllClosed()
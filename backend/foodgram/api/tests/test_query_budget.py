@@ -0,0 +1,242 @@
+import time
+from collections import namedtuple
+
+from api.authentication import CachedTokenAuthentication
+from api.urls import router_v1
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .base import PASSWORD, FixtureTestCase, recipe_data
+
+PAGE_SIZES = (1, 20)
+
+# route — имя маршрута router_v1, kwargs и data получают тест и
+# возвращают аргументы reverse и тело запроса. Если в query есть {size},
+# запрос выполняется для каждого размера из PAGE_SIZES, и число запросов
+# к БД не должно от него зависеть.
+Endpoint = namedtuple(
+    'Endpoint',
+    'route method user status budget kwargs data query',
+    defaults=(None, None, ''),
+)
+
+
+ENDPOINTS = (
+    Endpoint('users-list', 'get', 'anon', 200, 1, query='?limit={size}'),
+    Endpoint('users-list', 'get', 'auth', 200, 3, query='?limit={size}'),
+    Endpoint('users-list', 'post', 'anon', 201, 5, data=lambda test: {
+        'username': 'newbie', 'email': 'newbie@example.com',
+        'first_name': 'Новый', 'last_name': 'Пользователь',
+        'password': PASSWORD,
+    }),
+    Endpoint('users-activation', 'post', 'anon', 400, 0,
+             data=lambda test: {'uid': 'x', 'token': 'x'}),
+    # Хэш пароля не хранится в кэше токенов: проверка текущего пароля
+    # загружает его из БД.
+    Endpoint('users-change-password', 'post', 'auth', 204, 2,
+             data=lambda test: {'current_password': PASSWORD,
+                                'new_password': PASSWORD + '!'}),
+    Endpoint('users-get-self-page', 'get', 'auth', 200, 1),
+    Endpoint('users-me', 'get', 'auth', 200, 0),
+    Endpoint('users-me', 'put', 'auth', 200, 1, data=lambda test: {
+        'username': 'reader', 'email': 'reader@example.com',
+        'first_name': 'Читатель', 'last_name': 'Тестовый',
+    }),
+    Endpoint('users-me', 'patch', 'auth', 200, 1,
+             data=lambda test: {'first_name': 'Иван'}),
+    Endpoint('users-me', 'delete', 'auth', 204, 22,
+             data=lambda test: {'current_password': PASSWORD}),
+    Endpoint('users-resend-activation', 'post', 'anon', 400, 1,
+             data=lambda test: {'email': test.user.email}),
+    # Для существующей почты djoser требует PASSWORD_RESET_CONFIRM_URL,
+    # который в проекте не настроен.
+    Endpoint('users-reset-password', 'post', 'anon', 204, 1,
+             data=lambda test: {'email': 'unknown@example.com'}),
+    Endpoint('users-reset-password-confirm', 'post', 'anon', 400, 0,
+             data=lambda test: {'uid': 'x', 'token': 'x',
+                                'new_password': PASSWORD}),
+    Endpoint('users-reset-username', 'post', 'anon', 204, 1,
+             data=lambda test: {'email': 'unknown@example.com'}),
+    Endpoint('users-reset-username-confirm', 'post', 'anon', 400, 1,
+             data=lambda test: {'uid': 'x', 'token': 'x',
+                                'new_email': 'x@example.com'}),
+    Endpoint('users-set-password', 'post', 'auth', 204, 2,
+             data=lambda test: {'current_password': PASSWORD,
+                                'new_password': PASSWORD + '!',
+                                're_new_password': PASSWORD + '!'}),
+    # При LOGIN_FIELD = 'email' сериализатор djoser ждёт new_email, а view
+    # читает new_username, поэтому проверяется только путь валидации.
+    Endpoint('users-set-username', 'post', 'auth', 400, 1,
+             data=lambda test: {'current_password': PASSWORD}),
+    Endpoint('users-subscriptions', 'get', 'auth', 200, 3,
+             query='?limit={size}&recipes_limit={size}'),
+    Endpoint('users-detail', 'get', 'anon', 401, 0,
+             kwargs=lambda test: {'id': test.authors[0].id}),
+    Endpoint('users-detail', 'get', 'auth', 200, 2,
+             kwargs=lambda test: {'id': test.authors[0].id}),
+    Endpoint('users-detail', 'put', 'auth', 200, 5,
+             kwargs=lambda test: {'id': test.user.id},
+             data=lambda test: {
+                 'username': 'reader', 'email': 'reader@example.com',
+                 'first_name': 'Читатель', 'last_name': 'Тестовый',
+             }),
+    Endpoint('users-detail', 'patch', 'auth', 200, 3,
+             kwargs=lambda test: {'id': test.user.id},
+             data=lambda test: {'first_name': 'Иван'}),
+    Endpoint('users-detail', 'delete', 'auth', 204, 23,
+             kwargs=lambda test: {'id': test.user.id},
+             data=lambda test: {'current_password': PASSWORD}),
+    Endpoint('users-subscribe', 'post', 'auth', 201, 8,
+             kwargs=lambda test: {'id': test.authors[-1].id}),
+    Endpoint('users-subscribe', 'delete', 'auth', 204, 6,
+             kwargs=lambda test: {'id': test.authors[0].id}),
+    Endpoint('tags-list', 'get', 'anon', 200, 1),
+    Endpoint('tags-list', 'get', 'auth', 200, 1),
+    Endpoint('tags-list', 'post', 'auth', 201, 3, data=lambda test: {
+        'name': 'Новый тег', 'color': '#123456', 'slug': 'new-tag'}),
+    Endpoint('tags-detail', 'get', 'anon', 200, 1,
+             kwargs=lambda test: {'pk': test.tags[0].id}),
+    Endpoint('tags-detail', 'put', 'auth', 200, 4,
+             kwargs=lambda test: {'pk': test.tags[0].id},
+             data=lambda test: {'name': 'Тег', 'color': '#654321',
+                                'slug': 'tag-renamed'}),
+    Endpoint('tags-detail', 'patch', 'auth', 200, 2,
+             kwargs=lambda test: {'pk': test.tags[0].id},
+             data=lambda test: {'color': '#654321'}),
+    Endpoint('tags-detail', 'delete', 'auth', 204, 3,
+             kwargs=lambda test: {'pk': test.tags[-1].id}),
+    Endpoint('ingredients-list', 'get', 'anon', 200, 1),
+    Endpoint('ingredients-list', 'get', 'anon', 200, 1,
+             query='?name=ингредиент {size}'),
+    Endpoint('ingredients-list', 'get', 'auth', 200, 1,
+             query='?name=ингредиент&limit={size}'),
+    Endpoint('ingredients-detail', 'get', 'anon', 200, 1,
+             kwargs=lambda test: {'pk': test.ingredients[0].id}),
+    Endpoint('recipes-list', 'get', 'anon', 200, 4, query='?limit={size}'),
+    Endpoint('recipes-list', 'get', 'auth', 200, 5, query='?limit={size}'),
+    Endpoint('recipes-list', 'get', 'auth', 200, 5,
+             query='?limit={size}&is_favorited=1&is_in_shopping_cart=1'),
+    # Соответствие slug -> id тегов загружается заново после очистки кэша.
+    Endpoint('recipes-list', 'get', 'anon', 200, 5,
+             query='?limit={size}&tags=tag-1&tags=tag-2'),
+    Endpoint('recipes-list', 'get', 'anon', 200, 5,
+             query='?limit={size}&tags=tag-1&tags=tag-2&tags_mode=all'),
+    Endpoint('recipes-list', 'get', 'anon', 200, 3,
+             query='?limit={size}&pagination=cursor'),
+    Endpoint('recipes-list', 'get', 'anon', 200, 4,
+             query='?search=рецепт&limit={size}'),
+    Endpoint('recipes-list', 'get', 'auth', 200, 6,
+             query='?search=ингредиент&tags=tag-1&limit={size}'),
+    # Перед каждым вызовом кэш очищается, поэтому в бюджет входит запрос,
+    # которым заново строится индекс ингредиентов в памяти.
+    Endpoint('recipes-list', 'get', 'anon', 200, 5,
+             query='?ingredients=1,2,3,4,5,6,7,8&max_missing=2&limit={size}'),
+    Endpoint('recipes-list', 'get', 'auth', 200, 7,
+             query='?exclude_ingredients=1,2&tags=tag-1&limit={size}'),
+    Endpoint('recipes-list', 'post', 'auth', 201, 17, data=recipe_data),
+    Endpoint('recipes-download-shopping-cart', 'get', 'auth', 200, 1),
+    Endpoint('recipes-detail', 'get', 'anon', 200, 4,
+             kwargs=lambda test: {'pk': test.recipes[0].id}),
+    Endpoint('recipes-detail', 'get', 'auth', 200, 5,
+             kwargs=lambda test: {'pk': test.recipes[0].id}),
+    Endpoint('recipes-detail', 'patch', 'auth', 200, 21,
+             kwargs=lambda test: {'pk': test.own_recipe.id},
+             data=recipe_data),
+    Endpoint('recipes-detail', 'delete', 'auth', 204, 12,
+             kwargs=lambda test: {'pk': test.own_recipe.id}),
+    Endpoint('recipes-favorite', 'post', 'auth', 201, 8,
+             kwargs=lambda test: {'pk': test.recipes[-1].id}),
+    Endpoint('recipes-favorite', 'delete', 'auth', 204, 6,
+             kwargs=lambda test: {'pk': test.recipes[0].id}),
+    Endpoint('recipes-shopping-cart', 'post', 'auth', 201, 12,
+             kwargs=lambda test: {'pk': test.recipes[-1].id}),
+    Endpoint('recipes-shopping-cart', 'delete', 'auth', 204, 9,
+             kwargs=lambda test: {'pk': test.recipes[0].id}),
+    Endpoint('metrics', 'get', 'anon', 401, 0),
+    Endpoint('metrics', 'get', 'auth', 403, 0),
+)
+
+
+class QueryBudgetTest(FixtureTestCase):
+    """Число запросов к БД для каждого маршрута router_v1.
+
+    Бюджеты зафиксированы для фикстуры с десятками авторов и рецептов и
+    не должны расти вместе с размером страницы и выдачи.
+    """
+
+    report = []
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.report:
+            print('\nQuery budget report')
+            for line in cls.report:
+                print(line)
+
+    def call(self, endpoint, query):
+        url = reverse(
+            endpoint.route,
+            kwargs=endpoint.kwargs(self) if endpoint.kwargs else None)
+        data = endpoint.data(self) if endpoint.data else None
+        client = self.get_client(endpoint.user)
+        cache.clear()
+        # Бюджеты считаются для пользователя, токен которого уже в кэше.
+        if endpoint.user == 'auth':
+            CachedTokenAuthentication().authenticate_credentials(
+                self.token.key)
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, endpoint.method)(
+                    url + query, data, format='json')
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        self.assertEqual(
+            response.status_code, endpoint.status,
+            f'{endpoint.method.upper()} {url}{query}: '
+            f'{getattr(response, "data", None)}'
+        )
+        return len(queries), elapsed
+
+    def test_every_route_has_a_budget(self):
+        routes = set()
+        for pattern in router_v1.urls:
+            actions = getattr(pattern.callback, 'actions', None)
+            if not actions:
+                continue
+            allowed = pattern.callback.cls.http_method_names
+            # HEAD DRF добавляет в actions при первом запросе к маршруту,
+            # он обслуживается тем же обработчиком, что и GET.
+            routes.update(
+                (pattern.name, method) for method in actions
+                if method in allowed and method != 'head'
+            )
+        covered = {(endpoint.route, endpoint.method)
+                   for endpoint in ENDPOINTS}
+        self.assertEqual(routes - covered, set())
+
+    def test_query_budgets(self):
+        for endpoint in ENDPOINTS:
+            queries = [endpoint.query.format(size=size)
+                       for size in PAGE_SIZES]
+            if queries[0] == queries[1]:
+                queries = queries[:1]
+            with self.subTest(route=endpoint.route, method=endpoint.method,
+                              user=endpoint.user, query=endpoint.query):
+                counts = []
+                for query in queries:
+                    count, elapsed = self.call(endpoint, query)
+                    counts.append(count)
+                    self.report.append(
+                        f'{endpoint.method.upper():6} {endpoint.route:32} '
+                        f'{endpoint.user:4} {query or "-":45} '
+                        f'queries={count:<3} budget={endpoint.budget:<3} '
+                        f'{elapsed * 1000:.1f}ms'
+                    )
+                self.assertLessEqual(max(counts), endpoint.budget)
+                self.assertEqual(len(set(counts)), 1, counts)
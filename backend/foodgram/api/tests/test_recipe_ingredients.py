@@ -0,0 +1,70 @@
+from api.serializers import RecipeCreateSerializer
+from django.urls import reverse
+from recipes.models import RecipeIngredient, ShoppingCartIngredient
+from recipes.shopping_cart import (compute_shopping_cart_totals,
+                                   rebuild_shopping_cart_totals)
+
+from .base import FixtureTestCase, recipe_data
+
+
+class RecipeIngredientsTest(FixtureTestCase):
+    """Обновление ингредиентов рецепта по разнице со старым составом."""
+
+    def set_rows(self, recipe, rows):
+        recipe.ingredient_list.all().delete()
+        return [
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount)
+            for ingredient, amount in rows
+        ]
+
+    def test_updating_of_ingredients(self):
+        recipe = self.own_recipe
+        a, b, c, d = self.ingredients[:4]
+        # Две строки одного ингредиента остались от данных до проверки
+        # повторов.
+        first_a, _, kept_b, _ = self.set_rows(
+            recipe, ((a, 1), (a, 2), (b, 3), (c, 4)))
+        delta = RecipeCreateSerializer().updating_of_ingredients(recipe, [
+            {'id': a.id, 'amount': 5},
+            {'id': b.id, 'amount': 3},
+            {'id': d.id, 'amount': 6},
+        ])
+        self.assertEqual(delta, {a.id: 2, b.id: 0, c.id: -4, d.id: 6})
+        rows = {
+            row.ingredient_id: (row.id, row.amount)
+            for row in recipe.ingredient_list.all()
+        }
+        self.assertEqual(recipe.ingredient_list.count(), 3)
+        self.assertEqual(rows[a.id], (first_a.id, 5))
+        self.assertEqual(rows[b.id], (kept_b.id, 3))
+        self.assertEqual(rows[d.id][1], 6)
+
+    def test_update_keeps_cart_totals(self):
+        client = self.get_client('auth')
+        recipe = self.own_recipe
+        a, b, c = self.ingredients[-3:]
+        self.set_rows(recipe, ((a, 1), (a, 2), (b, 3)))
+        client.post(reverse('recipes-shopping-cart', args=(recipe.id,)))
+        rebuild_shopping_cart_totals([self.user.id])
+        data = recipe_data(self)
+        data['ingredients'] = [{'id': a.id, 'amount': 4},
+                               {'id': c.id, 'amount': 5}]
+        response = client.patch(reverse('recipes-detail', args=(recipe.id,)),
+                                data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(ShoppingCartIngredient.objects.filter(
+                user=self.user
+            ).values_list('user_id', 'ingredient_id', 'amount')),
+            set(compute_shopping_cart_totals([self.user.id])))
+
+    def test_unknown_ingredients(self):
+        client = self.get_client('auth')
+        data = recipe_data(self)
+        data['ingredients'] += [{'id': 999999, 'amount': 1},
+                                {'id': 999998, 'amount': 1}]
+        response = client.post(reverse('recipes-list'), data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Ингредиенты не найдены: 999998, 999999!',
+                      str(response.data))
@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from recipes.models import ShoppingCartIngredient
+from recipes.shopping_cart import compute_shopping_cart_totals
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .base import FixtureTestCase, recipe_data
+
+
+class ShoppingCartTotalsTest(FixtureTestCase):
+    """Суммы списка покупок совпадают с агрегатом по рецептам в корзине."""
+
+    def assertTotals(self, *users):
+        user_ids = [user.id for user in users]
+        expected = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in compute_shopping_cart_totals(user_ids)
+        }
+        self.assertEqual(dict(
+            ((user_id, ingredient_id), amount)
+            for user_id, ingredient_id, amount
+            in ShoppingCartIngredient.objects.filter(
+                user_id__in=user_ids
+            ).values_list('user_id', 'ingredient_id', 'amount')
+        ), expected)
+
+    def test_totals(self):
+        reader = self.get_client('auth')
+        author = self.authors[0]
+        writer = APIClient()
+        writer.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(
+            user=author).key)
+        recipe = self.recipes[-1]
+        cart = reverse('recipes-shopping-cart', args=(recipe.id,))
+        self.assertTotals(self.user)
+        self.assertEqual(reader.post(cart).status_code, 201)
+        self.assertTotals(self.user)
+        self.assertEqual(reader.delete(cart).status_code, 204)
+        self.assertTotals(self.user)
+
+        own = self.recipes[0]
+        self.assertEqual(own.author, author)
+        # Рецепт уже в списке покупок читателя.
+        self.assertTrue(own.recipe_shopping_lists.filter(
+            user=self.user).exists())
+        data = recipe_data(self)
+        # Часть ингредиентов остаётся, часть меняет количество, часть
+        # новая; остальные удаляются.
+        kept = own.ingredient_list.order_by('id')[:2]
+        data['ingredients'] = [
+            {'id': kept[0].ingredient_id, 'amount': kept[0].amount},
+            {'id': kept[1].ingredient_id, 'amount': kept[1].amount + 5},
+            {'id': self.ingredients[-1].id, 'amount': 7},
+        ]
+        response = writer.patch(reverse('recipes-detail', args=(own.id,)),
+                                data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTotals(self.user)
+        self.assertEqual(
+            writer.delete(reverse('recipes-detail', args=(own.id,))
+                          ).status_code, 204)
+        self.assertTotals(self.user)
+        call_command('rebuild_shopping_cart_totals', '--verify',
+                     stdout=StringIO())
+
+    def test_verify(self):
+        stdout = StringIO()
+        call_command('rebuild_shopping_cart_totals', '--verify',
+                     stdout=stdout)
+        self.assertIn('consistent', stdout.getvalue())
+        ShoppingCartIngredient.objects.filter(user=self.user).order_by(
+            'id')[:1].get().delete()
+        with self.assertRaisesMessage(CommandError, str(self.user.id)):
+            call_command('rebuild_shopping_cart_totals', '--verify',
+                         stdout=StringIO())
+        call_command('rebuild_shopping_cart_totals', stdout=StringIO())
+        self.assertTotals(self.user)
+        call_command('rebuild_shopping_cart_totals', '--verify',
+                     stdout=StringIO())
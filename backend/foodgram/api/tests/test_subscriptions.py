@@ -0,0 +1,36 @@
+from django.urls import reverse
+from users.models import Subscription
+
+from .base import FixtureTestCase
+
+
+class SubscriptionsTest(FixtureTestCase):
+    """Подписки и параметр recipes_limit."""
+
+    def test_recipes_limit(self):
+        client = self.get_client('auth')
+        url = reverse('users-subscriptions')
+        for limit, expected in (('2', 2), ('0', 0), ('', 4)):
+            with self.subTest(limit=limit):
+                response = client.get(url, {'recipes_limit': limit})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    {len(author['recipes'])
+                     for author in response.data['results']}, {expected})
+        for limit in ('abc', '-1', '1.5'):
+            with self.subTest(limit=limit):
+                response = client.get(url, {'recipes_limit': limit})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('recipes_limit', response.data)
+
+    def test_subscribe_recipes_limit(self):
+        client = self.get_client('auth')
+        author = self.authors[-1]
+        url = reverse('users-subscribe', args=(author.id,))
+        response = client.post(f'{url}?recipes_limit=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscription.objects.filter(
+            user=self.user, author=author).exists())
+        response = client.post(f'{url}?recipes_limit=1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['recipes']), 1)
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .async_views import offload_routes
+from .views import (IngredientViewSet, MetricsView, RecipeViewSet, TagViewSet,
+                    UserViewSet)
 
 router_v1 = DefaultRouter()
 router_v1.register('users', UserViewSet, basename='users')
@@ -10,7 +13,11 @@ router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register('recipes', RecipeViewSet, basename='recipes')
 
 urlpatterns = [
-    path('', include(router_v1.urls)),
+    path('_metrics', MetricsView.as_view(), name='metrics'),
+    path('', include(
+        offload_routes(router_v1.urls) if settings.ASYNC_VIEWS
+        else router_v1.urls
+    )),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 
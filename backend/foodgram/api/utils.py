@@ -0,0 +1,68 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from recipes.models import Recipe
+from rest_framework.exceptions import ValidationError
+from users.models import Subscription
+
+
+def get_recipes_limit(request):
+    """Возвращает параметр recipes_limit запроса или None."""
+    limit = request.query_params.get('recipes_limit')
+    if not limit:
+        return None
+    if not limit.isdigit():
+        raise ValidationError(
+            {'recipes_limit': 'Укажите целое неотрицательное число!'})
+    return int(limit)
+
+
+def attach_recent_recipes(authors, limit=None):
+    """Загружает последние рецепты авторов одним запросом.
+
+    Рецепты каждого автора нумеруются оконной функцией
+    ROW_NUMBER() OVER (PARTITION BY author_id), из выборки остаются
+    первые limit записей. Результат сохраняется в recent_recipes.
+    """
+    authors = list(authors)
+    recipes = Recipe.objects.filter(
+        author__in=authors
+    ).order_by('author', '-pub_date', '-id')
+    if limit is not None:
+        ranked = recipes.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )).values('id', 'author_id', 'name', 'image', 'image_variants',
+                  'cooking_time', 'pub_date', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            'WHERE ranked.row_number <= %s ORDER BY ranked.row_number',
+            (*params, limit)
+        )
+    recipes_by_author = {author.id: [] for author in authors}
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recent_recipes = recipes_by_author[author.id]
+    return authors
+
+
+def get_subscribed_ids(request):
+    """Возвращает множество id авторов, на которых подписан пользователь.
+
+    Множество загружается одним запросом при первом обращении и
+    хранится на объекте запроса до конца его обработки.
+    """
+    if not hasattr(request, '_subscribed_ids'):
+        request._subscribed_ids = frozenset(
+            Subscription.objects.filter(
+                user=request.user
+            ).values_list('author_id', flat=True)
+        )
+    return request._subscribed_ids
+
+
+def reset_subscribed_ids(request):
+    """Сбрасывает кэш подписок после их изменения в рамках запроса."""
+    request.__dict__.pop('_subscribed_ids', None)
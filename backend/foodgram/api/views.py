@@ -1,31 +1,52 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
+from recipes.counters import change_counter
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingList, Tag)
+                            RecipeIngredient, ShoppingCartIngredient,
+                            ShoppingList, Tag)
+from recipes.shopping_cart import (get_recipe_amounts,
+                                   update_shopping_cart_totals)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from users.models import Subscription, User
 
-from .filters import IngredientFilter, RecipeFilter
-from .pagination import CustomPagination
+from .cache import AnonymousCacheMixin, ConditionalGetMixin
+from .filters import RecipeFilter
+from .metrics import registry
+from .pagination import RecipePagination, UserPagination
+from .parsers import RecipeJSONParser
 from .permissions import IsOwnerOrReadOnly
+from .renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                        ShoppingListTextRenderer)
 from .serializers import (ChangePasswordSerializer, FavoriteRecipeSerializer,
                           IngredientSerializer, RecipeCreateSerializer,
-                          RecipeSerializer, ShoppingListSerializer,
-                          SubscriptionSerializer, TagSerializer,
-                          UserSerializer)
+                          RecipeListSerializer, RecipeSerializer,
+                          ShoppingListSerializer, SubscriptionSerializer,
+                          TagSerializer, UserSerializer)
+from .utils import (attach_recent_recipes, get_recipes_limit,
+                    reset_subscribed_ids)
+
+SHOPPING_LIST_CHUNK_SIZE = 2000
 
 
 class UserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    pagination_class = CustomPagination
+    pagination_class = UserPagination
 
     @action(
         methods=('get',),
@@ -39,7 +60,8 @@ class UserViewSet(UserViewSet):
     @action(detail=False, methods=['post'],
             permission_classes=(IsAuthenticated,))
     def change_password(self, request):
-        serializer = ChangePasswordSerializer(request.user, data=request.data)
+        serializer = ChangePasswordSerializer(
+            request.user, data=request.data, context={'request': request})
         if serializer.is_valid(raise_exception=True):
             serializer.save()
         return Response({'detail': 'Пароль успешно изменен!'},
@@ -50,6 +72,7 @@ class UserViewSet(UserViewSet):
         methods=['POST', 'DELETE'],
         permission_classes=(IsAuthenticated,)
     )
+    @transaction.atomic
     def subscribe(self, request, id):
         user = request.user
         author = get_object_or_404(User, pk=id)
@@ -60,87 +83,166 @@ class UserViewSet(UserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             Subscription.objects.create(user=user, author=author)
+            change_counter(User, author.id, 'followers_count', 1)
+            reset_subscribed_ids(request)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
             get_object_or_404(
                 Subscription, user=user, author=author
             ).delete()
+            change_counter(User, author.id, 'followers_count', -1)
+            reset_subscribed_ids(request)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(user_followers__user=user)
+        queryset = User.objects.filter(user_followers__user=user).annotate(
+            is_subscribed=Value(True),
+        ).order_by('username')
         pages = self.paginate_queryset(queryset)
+        attach_recent_recipes(pages, get_recipes_limit(request))
         serializer = SubscriptionSerializer(
             pages, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    filter_backends = (IngredientFilter, )
-    search_fields = ('^name', )
     pagination_class = None
+    cache_scopes = ('ingredients',)
+
+    def filter_queryset(self, queryset):
+        name = self.request.query_params.get('name')
+        if self.action != 'list' or name is None:
+            return super().filter_queryset(queryset)
+        limit = self.request.query_params.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                raise ValidationError(
+                    {'limit': 'Укажите целое положительное число!'})
+            limit = int(limit)
+        return ingredient_index.search(name, limit)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                 viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
+    cache_scopes = ('tags',)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsOwnerOrReadOnly,)
-    pagination_class = CustomPagination
+    parser_classes = (RecipeJSONParser, FormParser, MultiPartParser)
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     http_method_names = ['get', 'post', 'patch', 'create', 'delete']
+    cache_scopes = ('recipes', 'tags', 'ingredients', 'users')
+
+    def get_cache_scopes(self):
+        if self.action == 'retrieve':
+            return (f'recipe:{self.kwargs["pk"]}', 'tags', 'ingredients',
+                    'users')
+        return super().get_cache_scopes()
+
+    def get_etag_extra(self):
+        if self.action == 'retrieve' and self.kwargs['pk'].isdigit():
+            return str(Recipe.objects.filter(
+                pk=self.kwargs['pk']
+            ).values_list('updated_at', flat=True).first())
+        if self.action == 'list':
+            # Добавление в избранное не меняет версию ленты, поэтому ETag
+            # ленты обновляется не реже, чем истекает её кэш.
+            return int(time.time() // settings.API_CACHE_TIMEOUT)
+        return None
+
+    def get_queryset(self):
+        # Поисковый вектор размером с описание нужен только фильтру.
+        queryset = Recipe.objects.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_list',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(FavoriteRecipe.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+                is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+            )
+        return queryset
 
     def get_serializer_class(self):
+        if self.action == 'list':
+            return RecipeListSerializer
         if self.request.method == 'GET':
             return RecipeSerializer
         return RecipeCreateSerializer
 
-    @action(detail=False, methods=['GET'])
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        update_shopping_cart_totals(
+            instance.recipe_shopping_lists.values_list('user_id', flat=True),
+            {ingredient_id: -amount for ingredient_id, amount
+             in get_recipe_amounts(instance).items()}
+        )
+        instance.delete()
+        change_counter(User, instance.author_id, 'recipes_count', -1)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(ShoppingListTextRenderer, ShoppingListCSVRenderer,
+                          ShoppingListJSONRenderer)
+    )
     def download_shopping_cart(self, request):
-        shopping_list_recipes = ShoppingList.objects.filter(
+        ingredients = ShoppingCartIngredient.objects.filter(
             user=request.user
-        ).values_list('recipe', flat=True)
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in=shopping_list_recipes
         ).order_by('ingredient__name').values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-        return self.send_message(ingredients)
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        )
+        return self.send_message(
+            ingredients.iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE),
+            request.accepted_renderer
+        )
 
     @staticmethod
-    def send_message(ingredients):
-        shopping_list = 'Список покупок:'
-        for ingredient in ingredients:
-            shopping_list += (
-                f"\n{ingredient['ingredient__name']} "
-                f"({ingredient['ingredient__measurement_unit']}) - "
-                f"{ingredient['amount']}")
-        file = 'shopping_list.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename="{file}.txt"'
+    def send_message(ingredients, renderer):
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        file = f'shopping_list.{renderer.format}'
+        response['Content-Disposition'] = f'attachment; filename="{file}"'
         return response
 
     @action(
         detail=True,
         methods=('POST',),
         permission_classes=(IsAuthenticated,))
+    @transaction.atomic
     def shopping_cart(self, request, pk):
         context = {'request': request}
-        recipe = get_object_or_404(Recipe, id=pk)
+        recipe = get_object_or_404(
+            Recipe.objects.defer('search_vector'), id=pk)
         data = {
             'user': request.user.id,
             'recipe': recipe.id
@@ -148,24 +250,38 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = ShoppingListSerializer(data=data, context=context)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        change_counter(Recipe, recipe.id, 'in_carts_count', 1)
+        update_shopping_cart_totals(
+            [request.user.id], get_recipe_amounts(recipe))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
+    @transaction.atomic
     def destroy_shopping_cart(self, request, pk):
+        recipe = get_object_or_404(
+            Recipe.objects.defer('search_vector'), id=pk)
         get_object_or_404(
             ShoppingList,
             user=request.user.id,
-            recipe=get_object_or_404(Recipe, id=pk)
+            recipe=recipe
         ).delete()
+        change_counter(Recipe, recipe.id, 'in_carts_count', -1)
+        update_shopping_cart_totals(
+            [request.user.id],
+            {ingredient_id: -amount for ingredient_id, amount
+             in get_recipe_amounts(recipe).items()}
+        )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=True,
         methods=('POST',),
         permission_classes=[IsAuthenticated])
+    @transaction.atomic
     def favorite(self, request, pk):
         context = {"request": request}
-        recipe = get_object_or_404(Recipe, id=pk)
+        recipe = get_object_or_404(
+            Recipe.objects.defer('search_vector'), id=pk)
         data = {
             'user': request.user.id,
             'recipe': recipe.id
@@ -173,13 +289,30 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = FavoriteRecipeSerializer(data=data, context=context)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        change_counter(Recipe, recipe.id, 'favorites_count', 1)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @favorite.mapping.delete
+    @transaction.atomic
     def destroy_favorite(self, request, pk):
+        recipe = get_object_or_404(
+            Recipe.objects.defer('search_vector'), id=pk)
         get_object_or_404(
             FavoriteRecipe,
             user=request.user,
-            recipe=get_object_or_404(Recipe, id=pk)
+            recipe=recipe
         ).delete()
+        change_counter(Recipe, recipe.id, 'favorites_count', -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricsView(APIView):
+    """Метрики запросов в текстовом формате Prometheus для персонала."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -0,0 +1,68 @@
+from django.db.backends.postgresql import base, creation
+
+from .pool import close_pool, get_pool, is_usable, pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # PostgreSQL не удаляет базу, к которой открыты соединения пула.
+        close_pool((self.connection.alias, test_database_name))
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой постоянных соединений и пулом.
+
+    CONN_HEALTH_CHECKS: постоянное соединение (CONN_MAX_AGE > 0)
+    проверяется SELECT 1 перед первым запросом к БД в каждом HTTP-запросе
+    и переоткрывается, если сервер его закрыл, как в Django 4.1.
+    POOL: словарь MIN_SIZE, MAX_SIZE, TIMEOUT. Соединения берутся из пула
+    процесса, общего для всех потоков, и возвращаются в него вместо
+    закрытия. С CONN_HEALTH_CHECKS пул проверяет соединение перед выдачей.
+    """
+
+    creation_class = DatabaseCreation
+    health_check_done = False
+    pool_key = None
+
+    def get_new_connection(self, conn_params):
+        self.health_check_done = True
+        options = self.settings_dict.get('POOL')
+        if not options:
+            self.pool_key = None
+            return super().get_new_connection(conn_params)
+        self.pool_key = self.alias, self.settings_dict['NAME']
+        pool = get_pool(
+            self.pool_key, options,
+            is_usable if self.settings_dict.get('CONN_HEALTH_CHECKS')
+            else None)
+        connection = pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params))
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.pool_key is None:
+            return super()._close()
+        pool = pools.get(self.pool_key)
+        with self.wrap_database_errors:
+            if pool is None:
+                self.connection.close()
+            else:
+                pool.release(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (self.connection is not None and not self.health_check_done
+                and self.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
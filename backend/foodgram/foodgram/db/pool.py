@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import Counter, deque
+
+from psycopg2 import Error, OperationalError
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_UNKNOWN)
+
+# Соединения сверх MIN_SIZE, простоявшие дольше, закрываются.
+IDLE_TIMEOUT = 60
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    """Свободное соединение не появилось за время ожидания."""
+
+
+def is_usable(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except Error:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """Пул соединений psycopg2, общий для потоков процесса.
+
+    Открывает не больше max_size соединений. Поток, которому соединения
+    не хватило, ждёт его timeout секунд и получает PoolTimeout. Выдаётся
+    последнее возвращённое соединение, поэтому при спаде нагрузки лишние
+    простаивают и закрываются через IDLE_TIMEOUT, пока открытых не
+    останется min_size. Если задан check, соединение проверяется перед
+    выдачей и при неудаче заменяется новым.
+    """
+
+    def __init__(self, min_size, max_size, timeout, check=None):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check = check
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.size = 0
+        self.stats = Counter(
+            acquired=0, created=0, closed=0, waits=0, timeouts=0)
+        self.wait_time = 0
+
+    def acquire(self, connect):
+        """Выдаёт соединение из пула или открывает новое через connect."""
+        while True:
+            connection = self.take()
+            if connection is None:
+                return self.open(connect)
+            if self.check is None or self.check(connection):
+                return connection
+            self.discard(connection)
+
+    def take(self):
+        # None означает, что место под новое соединение уже занято.
+        with self.condition:
+            if not self.idle and self.size >= self.max_size:
+                self.stats['waits'] += 1
+                started = time.monotonic()
+                deadline = started + self.timeout
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        self.wait_time += time.monotonic() - started
+                        raise PoolTimeout(
+                            f'No free database connection after '
+                            f'{self.timeout}s, {self.size} in use')
+                    self.condition.wait(remaining)
+                self.wait_time += time.monotonic() - started
+            self.stats['acquired'] += 1
+            if self.idle:
+                return self.idle.pop()[0]
+            self.size += 1
+            return None
+
+    def open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.stats['created'] += 1
+        return connection
+
+    def release(self, connection):
+        """Возвращает соединение; сломанное или лишнее закрывается."""
+        status = (TRANSACTION_STATUS_UNKNOWN if connection.closed
+                  else connection.get_transaction_status())
+        if status not in (TRANSACTION_STATUS_IDLE,
+                          TRANSACTION_STATUS_UNKNOWN):
+            try:
+                connection.rollback()
+            except Error:
+                status = TRANSACTION_STATUS_UNKNOWN
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            self.discard(connection)
+            return
+        now = time.monotonic()
+        with self.condition:
+            self.idle.append((connection, now))
+            expired = []
+            while (self.size - len(expired) > self.min_size
+                   and self.idle[0][1] < now - IDLE_TIMEOUT):
+                expired.append(self.idle.popleft()[0])
+            self.size -= len(expired)
+            self.stats['closed'] += len(expired)
+            self.condition.notify()
+        for connection in expired:
+            connection.close()
+
+    def discard(self, connection):
+        with self.condition:
+            self.size -= 1
+            self.stats['closed'] += 1
+            self.condition.notify()
+        connection.close()
+
+    def close(self):
+        """Закрывает простаивающие соединения, выданные — при возврате."""
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+            self.size -= len(idle)
+            self.stats['closed'] += len(idle)
+        for connection, _ in idle:
+            connection.close()
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.size - len(self.idle),
+                'max_size': self.max_size,
+                'wait_seconds': self.wait_time,
+                **self.stats,
+            }
+
+
+def get_pool(key, options, check=None):
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None:
+            pool = pools[key] = ConnectionPool(
+                options.get('MIN_SIZE', 1), options['MAX_SIZE'],
+                options.get('TIMEOUT', 10), check)
+        return pool
+
+
+def get_pool_stats():
+    """Статистика пулов процесса по ключу (alias, имя базы)."""
+    with pools_lock:
+        current = list(pools.items())
+    return {key: pool.get_stats() for key, pool in current}
+
+
+def close_pool(key):
+    with pools_lock:
+        pool = pools.pop(key, None)
+    if pool is not None:
+        pool.close()
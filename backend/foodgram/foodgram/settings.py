@@ -25,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,17 +55,62 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+# Пул соединений включается ненулевым DB_POOL_MAX_SIZE. С пулом
+# соединение возвращается в него после каждого запроса, без пула живёт
+# в потоке DB_CONN_MAX_AGE секунд.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', default='0'))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram.db',
         'NAME': os.getenv('POSTGRES_DB', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default=''),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_CONN_MAX_AGE', default='0' if DB_POOL_MAX_SIZE else '60')),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', default='True') == 'True',
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', default='1')),
+            'MAX_SIZE': DB_POOL_MAX_SIZE,
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default='10')),
+        } if DB_POOL_MAX_SIZE else None,
+    }
+}
+
+# Для локального запуска тестов без PostgreSQL: USE_SQLITE=True.
+if os.getenv('USE_SQLITE', 'False') == 'True':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
     }
 }
 
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default='300'))
+
+# Асинхронные view чтения, включаются в foodgram/asgi.py.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+# Выполнять асинхронные view чтения в общем потоке вместо пула.
+ASYNC_VIEWS_THREAD_SENSITIVE = os.getenv(
+    'ASYNC_VIEWS_THREAD_SENSITIVE', default='False') == 'True'
+
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', default='1'))
+METRICS_SERVER_TIMING = os.getenv(
+    'METRICS_SERVER_TIMING', default=str(DEBUG)) == 'True'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -87,10 +133,18 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ]
 }
 
+# Кэш аутентификации по токену: имя кэша из CACHES или local — LRU в
+# памяти процесса.
+AUTH_TOKEN_CACHE = os.getenv('AUTH_TOKEN_CACHE', default='default')
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', default='300'))
+AUTH_TOKEN_CACHE_SIZE = int(
+    os.getenv('AUTH_TOKEN_CACHE_SIZE', default='10000'))
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'SERIALIZERS': {
@@ -119,4 +173,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media'
 
+RECIPE_IMAGE_VARIANTS = {
+    'small': 320,
+    'medium': 960,
+}
+RECIPE_IMAGE_FORMAT = os.getenv('RECIPE_IMAGE_FORMAT', default='WEBP')
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', default='2'))
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_UPLOAD_SIZE', default=str(10 * 1024 * 1024)))
+RECIPE_IMAGE_MAX_SIDE = int(os.getenv('RECIPE_IMAGE_MAX_SIDE', default='8000'))
+
 AUTH_USER_MODEL = 'users.User'
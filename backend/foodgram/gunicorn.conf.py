@@ -0,0 +1,38 @@
+"""Настройки gunicorn для WSGI и ASGI.
+
+Режим выбирается переменной SERVER_MODE. Синхронный воркер WSGI занят
+запросом целиком, поэтому воркеров нужно больше, чем ядер. Воркер
+uvicorn обслуживает много соединений в цикле событий, а запросы к БД
+выполняет в пуле из ASGI_THREADS потоков, поэтому хватает воркера на
+ядро.
+
+Версии данных из recipes.versions хранятся в кэше Django. С кэшем в
+памяти процесса запись, обработанная одним воркером, не сбрасывает
+ETag, кэш ответов и индексы в памяти остальных, поэтому несколько
+воркеров запускаются только с общим CACHE_BACKEND.
+"""
+import multiprocessing
+import os
+
+CPUS = multiprocessing.cpu_count()
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+bind = os.getenv('GUNICORN_BIND', default='0.0.0.0:8000')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default='30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default='5'))
+
+if os.getenv('SERVER_MODE', default='wsgi') == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.getenv('GUNICORN_WORKERS', default=str(CPUS)))
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+    workers = int(os.getenv('GUNICORN_WORKERS', default=str(CPUS * 2 + 1)))
+    threads = int(os.getenv('GUNICORN_THREADS', default='1'))
+
+if (workers > 1
+        and os.getenv('CACHE_BACKEND', default=LOCAL_CACHE) == LOCAL_CACHE):
+    raise RuntimeError(
+        f'{workers} workers need a shared CACHE_BACKEND, for example '
+        f'django.core.cache.backends.memcached.PyMemcacheCache; '
+        f'set GUNICORN_WORKERS=1 to run with {LOCAL_CACHE}')
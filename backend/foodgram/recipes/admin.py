@@ -7,28 +7,53 @@ from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredient,
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient')
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
+    search_fields = ('^name',)
+    ordering = ('name', 'measurement_unit',)
+    show_full_result_count = False
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     inlines = [RecipeIngredientInline]
-    list_display = ('name', 'author', 'favorited_by_count',)
-    list_filter = ('name', 'author', 'tags',)
-    readonly_fields = ('favorited_by_count',)
-
-    def favorited_by_count(self, obj):
-        return obj.favorited_by.count()
-
-    favorited_by_count.short_description = "Кол-во в избранном"
-
-
-admin.site.register(RecipeIngredient)
-admin.site.register(FavoriteRecipe)
-admin.site.register(ShoppingList)
-admin.site.register(Tag)
+    list_display = ('name', 'author', 'pub_date', 'favorites_count',)
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('^name', '=author__username')
+    autocomplete_fields = ('author', 'tags',)
+    readonly_fields = ('favorites_count', 'in_carts_count',)
+    show_full_result_count = False
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'color',)
+    search_fields = ('name', 'slug',)
+
+
+@admin.register(RecipeIngredient)
+class RecipeIngredientAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'ingredient', 'amount',)
+    list_select_related = ('recipe', 'ingredient',)
+    autocomplete_fields = ('recipe', 'ingredient',)
+    search_fields = ('^recipe__name',)
+    show_full_result_count = False
+
+
+@admin.register(FavoriteRecipe, ShoppingList)
+class UserRecipeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'recipe',)
+    list_select_related = ('user', 'recipe',)
+    autocomplete_fields = ('user', 'recipe',)
+    search_fields = ('=user__username',)
+    show_full_result_count = False
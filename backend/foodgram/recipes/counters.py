@@ -0,0 +1,49 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Subscription, User
+
+from .models import FavoriteRecipe, Recipe, ShoppingList
+
+BATCH_SIZE = 1000
+
+# (модель, поле счётчика, связанная модель, поле связи)
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingList, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счётчик одним UPDATE с F()."""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def get_actual_count(related_model, related_field):
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def get_drifted(model, field, related_model, related_field):
+    """Возвращает пары (pk, фактическое значение) разошедшихся счётчиков."""
+    return model.objects.annotate(
+        actual=get_actual_count(related_model, related_field)
+    ).exclude(**{field: F('actual')}).values_list('pk', 'actual')
+
+
+def rebuild_counters(model, field, related_model, related_field):
+    drifted = list(get_drifted(model, field, related_model, related_field))
+    for start in range(0, len(drifted), BATCH_SIZE):
+        pks = [pk for pk, _ in drifted[start:start + BATCH_SIZE]]
+        model.objects.filter(pk__in=pks).update(
+            **{field: get_actual_count(related_model, related_field)})
+    return len(drifted)
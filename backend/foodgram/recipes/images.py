@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Recipe
+from .versions import bump_versions
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+# Форматы, в которых фото может нести EXIF, XMP или GPS.
+STRIPPED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'TIFF'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_variant_name(image_name, variant, image_format):
+    directory, file_name = os.path.split(image_name)
+    stem = os.path.splitext(file_name)[0]
+    return os.path.join(
+        directory, 'variants',
+        f'{stem}_{variant}.{FORMAT_EXTENSIONS[image_format]}'
+    )
+
+
+def render_variant(image, size, image_format):
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.LANCZOS)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    elif variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA')
+    buffer = BytesIO()
+    variant.save(buffer, image_format, quality=82, optimize=True)
+    return buffer.getvalue()
+
+
+def render_original(image, image_format, info):
+    buffer = BytesIO()
+    options = {key: info[key] for key in ('icc_profile', 'transparency')
+               if info.get(key) is not None}
+    if image_format in ('JPEG', 'WEBP'):
+        options['quality'] = 95
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def strip_original(image_file, image, image_format, info):
+    """Перезаписывает исходное фото без EXIF и других метаданных.
+
+    Файл сохраняется под прежним именем, поэтому ссылки на него не
+    меняются. Если имя успели занять, возвращается новое имя.
+    """
+    content = ContentFile(render_original(image, image_format, info))
+    storage = image_file.storage
+    storage.delete(image_file.name)
+    return storage.save(image_file.name, content)
+
+
+def create_image_variants(recipe):
+    """Очищает фото рецепта от метаданных и создаёт уменьшенные копии.
+
+    Возвращает имя очищенного фото и карту копий. Фото, уже очищенное
+    при прошлой обработке, повторно не перекодируется. Анимированные
+    изображения не перезаписываются: пересохранение оставило бы только
+    первый кадр. Поворот из EXIF применяется к пикселям.
+    """
+    image_file = recipe.image
+    storage = image_file.storage
+    image_format = settings.RECIPE_IMAGE_FORMAT
+    with storage.open(image_file.name) as file:
+        image = Image.open(file)
+        image.load()
+    # MPO — JPEG камер с дополнительными кадрами превью.
+    source_format = 'JPEG' if image.format == 'MPO' else image.format
+    info = image.info
+    strip = (source_format in STRIPPED_FORMATS
+             and not (source_format != 'JPEG'
+                      and getattr(image, 'is_animated', False))
+             and recipe.image_variants.get('source') != image_file.name)
+    image = ImageOps.exif_transpose(image)
+    name = image_file.name
+    if strip:
+        name = strip_original(image_file, image, source_format, info)
+    variants = {'source': name}
+    for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+        variant_name = get_variant_name(name, variant, image_format)
+        if storage.exists(variant_name):
+            storage.delete(variant_name)
+        variants[variant] = storage.save(variant_name, ContentFile(
+            render_variant(image, size, image_format)))
+    return name, variants
+
+
+def process_recipe_image(recipe_id, force=False):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return False
+    if not force and recipe.image_variants.get('source') == recipe.image.name:
+        return False
+    name, variants = create_image_variants(recipe)
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image=name, image_variants=variants, updated_at=timezone.now())
+    if updated:
+        bump_versions('recipes', f'recipe:{recipe_id}')
+    return bool(updated)
+
+
+def run_in_background(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Image processing failed for recipe %s', recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_recipe_image(recipe_id):
+    """Ставит обработку фото в пул потоков процесса.
+
+    При RECIPE_IMAGE_WORKERS = 0 обработка выполняется сразу.
+    """
+    global _executor
+    workers = settings.RECIPE_IMAGE_WORKERS
+    if not workers:
+        process_recipe_image(recipe_id)
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='recipe-images')
+    _executor.submit(run_in_background, recipe_id)
@@ -0,0 +1,65 @@
+import heapq
+import threading
+from bisect import bisect_left
+
+from .models import Ingredient
+from .versions import get_versions
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для поиска по префиксу.
+
+    Названия хранятся отсортированными в нижнем регистре, поэтому поиск
+    сводится к bisect и просмотру совпадающего диапазона. Индекс
+    перестраивается, когда меняется версия области ingredients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = None
+        self._ingredients = None
+
+    def _load(self):
+        version, = get_versions('ingredients')
+        if self._keys is not None and version == self._version:
+            return self._keys, self._ingredients
+        with self._lock:
+            if self._keys is None or version != self._version:
+                ingredients = sorted(
+                    Ingredient.objects.all(),
+                    key=lambda ingredient: (
+                        ingredient.name.casefold(), ingredient.id)
+                )
+                self._keys, self._ingredients = (
+                    [ingredient.name.casefold() for ingredient in ingredients],
+                    ingredients,
+                )
+                self._version = version
+            return self._keys, self._ingredients
+
+    def search(self, prefix, limit=None):
+        """Ищет ингредиенты, название которых начинается с prefix.
+
+        Сначала идёт точное совпадение, затем более короткие названия,
+        затем остальные по алфавиту.
+        """
+        keys, ingredients = self._load()
+        prefix = prefix.lstrip().casefold()
+        start = bisect_left(keys, prefix)
+        end = start
+        while end < len(keys) and keys[end].startswith(prefix):
+            end += 1
+
+        def rank(index):
+            return keys[index] != prefix, len(keys[index]), index
+
+        indexes = range(start, end)
+        if limit is None:
+            indexes = sorted(indexes, key=rank)
+        else:
+            indexes = heapq.nsmallest(limit, indexes, key=rank)
+        return [ingredients[index] for index in indexes]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,260 @@
+import random
+import time
+from io import BytesIO
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from PIL import Image
+from recipes.counters import COUNTERS, rebuild_counters
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingList, Tag)
+from recipes.search import rebuild_search_index
+from recipes.shopping_cart import rebuild_shopping_cart_totals
+from recipes.versions import bump_versions
+from users.models import Subscription, User
+
+IMAGE_NAME = 'recipes/image/fake.png'
+USERS_BATCH_SIZE = 500
+# Простые числа для перестановки рангов по id: rank * stride mod n.
+STRIDES = (1000003, 1000033, 1000037, 1000039)
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Дмитрий', 'Елена')
+LAST_NAMES = ('Иванова', 'Петров', 'Смирнова', 'Кузнецов', 'Попова', 'Орлов')
+DISHES = ('Суп', 'Салат', 'Пирог', 'Рагу', 'Каша', 'Запеканка', 'Паста')
+
+
+class ZipfSampler:
+    """Выбирает id из диапазона со степенным распределением популярности.
+
+    Ранг получается обратной функцией распределения x ** -exponent, а
+    ранги раскладываются по id перестановкой rank * stride + offset
+    по модулю размера, поэтому таблицы весов в памяти не нужны.
+    """
+
+    def __init__(self, rng, first_id, size, exponent, offset=0):
+        self.rng = rng
+        self.first_id = first_id
+        self.size = size
+        self.exponent = exponent
+        self.offset = offset
+        self.stride = next(
+            stride for stride in STRIDES if size % stride) % size or 1
+
+    def rank(self):
+        uniform = self.rng.random()
+        if self.exponent == 1:
+            value = (self.size + 1) ** uniform
+        else:
+            power = 1 - self.exponent
+            value = (1 + uniform * ((self.size + 1) ** power - 1)) ** (
+                1 / power)
+        return min(int(value) - 1, self.size - 1)
+
+    def __call__(self):
+        return self.first_id + (
+            self.rank() * self.stride + self.offset) % self.size
+
+
+def placeholder_image():
+    if not default_storage.exists(IMAGE_NAME):
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480), 'orange').save(buffer, 'PNG')
+        default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+    return IMAGE_NAME
+
+
+class Command(BaseCommand):
+    help = '''Generate a deterministic synthetic dataset with skewed
+    popularity for load and scale testing'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=10000)
+        parser.add_argument('--subscriptions', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, nargs=2, default=(3, 12),
+            metavar=('MIN', 'MAX'))
+        parser.add_argument(
+            '--tags', type=int, default=8,
+            help='Tags to create when the table is empty')
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent for authors, recipes, users and ingredients')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--password', default='fake-password',
+            help='Password of every generated user')
+
+    def insert(self, label, model, objects, ignore_conflicts=False):
+        before = model.objects.count() if ignore_conflicts else 0
+        total = 0
+        started = time.perf_counter()
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(
+                batch, ignore_conflicts=ignore_conflicts)
+            total += len(batch)
+        elapsed = time.perf_counter() - started
+        skipped = ''
+        if ignore_conflicts:
+            skipped = (
+                f', {total - model.objects.count() + before} duplicates '
+                f'skipped')
+        self.stdout.write(
+            f'{label}: {total} rows in {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else total:.0f} rows/s){skipped}'
+        )
+
+    def next_id(self, model):
+        return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+    def get_tags(self, count):
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        if tag_ids:
+            return tag_ids
+        for index in range(count):
+            Tag.objects.create(
+                name=f'Тег {index}',
+                color=f'#{self.rng.randrange(0x1000000):06X}',
+                slug=f'tag-{index}',
+            )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def get_ingredients(self):
+        if not Ingredient.objects.exists():
+            call_command('import_csv_data', stdout=self.stdout)
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('No ingredients to build recipes from')
+        self.rng.shuffle(ingredient_ids)
+        return ingredient_ids
+
+    def generate_users(self, first_id, count, password):
+        for user_id in range(first_id, first_id + count):
+            yield User(
+                id=user_id,
+                username=f'fake{user_id}',
+                email=f'fake{user_id}@example.com',
+                password=password,
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+            )
+
+    def generate_recipes(self, first_id, count, authors, image):
+        for recipe_id in range(first_id, first_id + count):
+            yield Recipe(
+                id=recipe_id,
+                author_id=authors(),
+                name=f'{self.rng.choice(DISHES)} №{recipe_id}',
+                text='Сгенерированный рецепт для нагрузочного тестирования.',
+                image=image,
+                cooking_time=min(int(self.rng.expovariate(1 / 40)) + 1, 600),
+            )
+
+    def generate_recipe_tags(self, first_id, count, tags, tag_ids):
+        through = Recipe.tags.through
+        for recipe_id in range(first_id, first_id + count):
+            for index in {tags() for _ in range(self.rng.randint(1, 3))}:
+                yield through(recipe_id=recipe_id, tag_id=tag_ids[index])
+
+    def generate_recipe_ingredients(self, first_id, count, ingredients,
+                                    ingredient_ids, bounds):
+        for recipe_id in range(first_id, first_id + count):
+            chosen = {ingredients() for _ in range(self.rng.randint(*bounds))}
+            for index in chosen:
+                yield RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_ids[index],
+                    amount=self.rng.randint(1, 50) * 10,
+                )
+
+    def generate_pairs(self, model, count, users, recipes):
+        for _ in range(count):
+            yield model(user_id=users(), recipe_id=recipes())
+
+    def generate_subscriptions(self, count, followers, authors):
+        for _ in range(count):
+            user_id, author_id = followers(), authors()
+            if user_id != author_id:
+                yield Subscription(user_id=user_id, author_id=author_id)
+
+    def rebuild_derived(self, first_user_id, users):
+        started = time.perf_counter()
+        for counter in COUNTERS:
+            rebuild_counters(*counter)
+        for start in range(first_user_id, first_user_id + users,
+                           USERS_BATCH_SIZE):
+            rebuild_shopping_cart_totals(range(
+                start, min(start + USERS_BATCH_SIZE, first_user_id + users)))
+        rebuild_search_index()
+        bump_versions('recipes', 'users', 'tags', 'ingredients')
+        self.stdout.write(
+            f'Counters, shopping cart totals and search index rebuilt in '
+            f'{time.perf_counter() - started:.1f}s'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        users, recipes = options['users'], options['recipes']
+        if users < 2 or recipes < 1:
+            raise CommandError('Need at least 2 users and 1 recipe')
+        skew = options['skew']
+        started = time.perf_counter()
+
+        tag_ids = self.get_tags(options['tags'])
+        ingredient_ids = self.get_ingredients()
+        first_user_id = self.next_id(User)
+        first_recipe_id = self.next_id(Recipe)
+        # Популярные авторы и самые активные пользователи — разные люди.
+        authors = ZipfSampler(self.rng, first_user_id, users, skew)
+        heavy_users = ZipfSampler(
+            self.rng, first_user_id, users, skew, offset=users // 2)
+        popular_recipes = ZipfSampler(
+            self.rng, first_recipe_id, recipes, skew)
+        tags = ZipfSampler(self.rng, 0, len(tag_ids), skew)
+        ingredients = ZipfSampler(self.rng, 0, len(ingredient_ids), skew)
+
+        self.insert('Users', User, self.generate_users(
+            first_user_id, users, make_password(options['password'])))
+        self.insert('Recipes', Recipe, self.generate_recipes(
+            first_recipe_id, recipes, authors, placeholder_image()))
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Recipe]):
+                cursor.execute(sql)
+        self.insert('Recipe tags', Recipe.tags.through,
+                    self.generate_recipe_tags(
+                        first_recipe_id, recipes, tags, tag_ids))
+        self.insert('Recipe ingredients', RecipeIngredient,
+                    self.generate_recipe_ingredients(
+                        first_recipe_id, recipes, ingredients,
+                        ingredient_ids, options['ingredients_per_recipe']))
+        self.insert('Favorites', FavoriteRecipe, self.generate_pairs(
+            FavoriteRecipe, options['favorites'], heavy_users,
+            popular_recipes), ignore_conflicts=True)
+        self.insert('Shopping carts', ShoppingList, self.generate_pairs(
+            ShoppingList, options['carts'], heavy_users,
+            popular_recipes), ignore_conflicts=True)
+        self.insert('Subscriptions', Subscription,
+                    self.generate_subscriptions(
+                        options['subscriptions'], heavy_users, authors),
+                    ignore_conflicts=True)
+        self.rebuild_derived(first_user_id, users)
+        self.stdout.write(
+            f'Done in {time.perf_counter() - started:.1f}s '
+            f'(users {first_user_id}..{first_user_id + users - 1}, '
+            f'recipes {first_recipe_id}..{first_recipe_id + recipes - 1})'
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = '''Create resized variants of recipe images'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants that already exist',
+        )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        recipe_ids = Recipe.objects.exclude(image='').values_list(
+            'id', flat=True)
+        for recipe_id in recipe_ids.iterator():
+            try:
+                processed += process_recipe_image(
+                    recipe_id, force=options['force'])
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'Recipe {recipe_id}: {error}')
+        self.stdout.write(
+            f'Processed {processed} recipes, failed {failed}')
@@ -1,18 +1,108 @@
 import csv
+import json
+import os
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from recipes.models import Ingredient
+from recipes.versions import bump_versions
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'data', 'ingredients.csv'
+)
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            name, measurement_unit = row
+            yield name, measurement_unit
+
+
+def read_json(file):
+    """Читает массив JSON-объектов по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        data = file.read(READ_SIZE)
+        buffer = buffer[position:] + data
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise CommandError('JSON file must contain an array')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                if not data:
+                    raise CommandError(f'Invalid JSON file: {error}')
+                break
+            yield item['name'], item['measurement_unit']
+        if not data:
+            raise CommandError(
+                'Unexpected end of JSON file' if started
+                else 'JSON file must contain an array')
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
 
 
 class Command(BaseCommand):
-    help = '''Load ingredients from a CSV file into the database'''
+    help = '''Load ingredients from a CSV or JSON file into the database'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='File format, detected from the extension by default',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
 
     def handle(self, *args, **options):
-        csv_file = 'recipes/data/ingredients.csv'
-        with open(csv_file, encoding='utf-8') as file:
-            file_reader = csv.reader(file)
-            for name, measurement_unit in file_reader:
-                Ingredient.objects.get_or_create(
-                    name=name,
-                    measurement_unit=measurement_unit
-                )
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Unsupported file format: {path}')
+        batch_size = options['batch_size']
+        before = Ingredient.objects.count()
+        total = 0
+        started = time.perf_counter()
+        with open(path, encoding='utf-8') as file:
+            rows = READERS[file_format](file)
+            while True:
+                batch = [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in islice(rows, batch_size)
+                ]
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+        elapsed = time.perf_counter() - started
+        inserted = Ingredient.objects.count() - before
+        bump_versions('ingredients')
+        self.stdout.write(
+            f'Read {total} rows: inserted {inserted}, '
+            f'skipped {total - inserted} in {elapsed:.2f}s '
+            f'({total / elapsed if elapsed else total:.0f} rows/s)'
+        )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.counters import COUNTERS, get_drifted, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = '''Reconcile denormalized recipe and user counters with the
+    related rows'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report counters that have drifted',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            return self.verify()
+        for counter in COUNTERS:
+            with transaction.atomic():
+                fixed = rebuild_counters(*counter)
+            model, field = counter[:2]
+            self.stdout.write(
+                f'{model.__name__}.{field}: fixed {fixed} rows')
+
+    def verify(self):
+        drifted = []
+        for counter in COUNTERS:
+            model, field = counter[:2]
+            pks = [pk for pk, _ in get_drifted(*counter)]
+            if pks:
+                drifted.append(
+                    f'{model.__name__}.{field} ({len(pks)} rows: '
+                    f'{", ".join(map(str, pks[:20]))})'
+                )
+        if drifted:
+            raise CommandError(f'Counters drifted: {"; ".join(drifted)}')
+        self.stdout.write('Counters are consistent')
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.search import rebuild_search_index
+from recipes.versions import bump_versions
+
+
+class Command(BaseCommand):
+    help = '''Rebuild the recipe full-text search index from names, texts
+    and ingredient names'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_search_index(options['batch_size'])
+        bump_versions('recipes')
+        self.stdout.write(
+            f'Indexed {total} recipes in '
+            f'{time.perf_counter() - started:.1f}s')
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import ShoppingCartIngredient, ShoppingList
+from recipes.shopping_cart import (compute_shopping_cart_totals,
+                                   rebuild_shopping_cart_totals)
+
+USERS_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = '''Rebuild or verify the per-user shopping cart ingredient totals'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report users whose totals have drifted',
+        )
+
+    def get_user_ids(self):
+        user_ids = set(ShoppingList.objects.values_list('user_id', flat=True))
+        user_ids.update(
+            ShoppingCartIngredient.objects.values_list('user_id', flat=True))
+        user_ids = sorted(user_ids)
+        for start in range(0, len(user_ids), USERS_BATCH_SIZE):
+            yield user_ids[start:start + USERS_BATCH_SIZE]
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            return self.verify()
+        users = 0
+        for user_ids in self.get_user_ids():
+            with transaction.atomic():
+                rebuild_shopping_cart_totals(user_ids)
+            users += len(user_ids)
+        self.stdout.write(f'Rebuilt shopping cart totals for {users} users')
+
+    def verify(self):
+        drifted = set()
+        for user_ids in self.get_user_ids():
+            expected = {
+                (user_id, ingredient_id): amount
+                for user_id, ingredient_id, amount
+                in compute_shopping_cart_totals(user_ids) if amount > 0
+            }
+            actual = {
+                (user_id, ingredient_id): amount
+                for user_id, ingredient_id, amount
+                in ShoppingCartIngredient.objects.filter(
+                    user_id__in=user_ids
+                ).values_list('user_id', 'ingredient_id', 'amount')
+            }
+            drifted.update(
+                user_id for user_id, ingredient_id
+                in expected.keys() | actual.keys()
+                if expected.get((user_id, ingredient_id))
+                != actual.get((user_id, ingredient_id))
+            )
+        if drifted:
+            raise CommandError(
+                f'Shopping cart totals drifted for {len(drifted)} users: '
+                f'{", ".join(map(str, sorted(drifted)[:20]))}'
+            )
+        self.stdout.write('Shopping cart totals are consistent')
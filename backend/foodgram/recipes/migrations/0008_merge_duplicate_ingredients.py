@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:14
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1).order_by()
+    for duplicate in duplicates:
+        keep_id = duplicate['keep_id']
+        extra_ids = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(id=keep_id).values_list('id', flat=True))
+        RecipeIngredient.objects.filter(
+            ingredient_id__in=extra_ids
+        ).update(ingredient_id=keep_id)
+        for total in ShoppingCartIngredient.objects.filter(
+            ingredient_id__in=extra_ids
+        ):
+            kept, _ = ShoppingCartIngredient.objects.get_or_create(
+                user_id=total.user_id, ingredient_id=keep_id)
+            kept.amount += total.amount
+            kept.save()
+            total.delete()
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
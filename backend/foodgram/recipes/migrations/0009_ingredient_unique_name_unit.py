@@ -0,0 +1,21 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Дубли слиты в отдельной миграции и её транзакции: PostgreSQL
+    # не меняет таблицу с отложенными проверками, а частично
+    # выполненное слияние откатывается целиком.
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0008_merge_duplicate_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_measurement_unit'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# Поиск в админке по префиксу (^name) в PostgreSQL выполняется как
+# UPPER(name::text) LIKE UPPER('...%'). Обычный btree-индекс для LIKE при
+# локали, отличной от C, не используется, поэтому нужен индекс по
+# выражению с text_pattern_ops. В других СУБД индексы не создаются.
+INDEXES = (
+    ('recipe_name_upper_idx', 'recipes_recipe', 'name'),
+    ('ingredient_name_upper_idx', 'recipes_ingredient', 'name'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'(UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
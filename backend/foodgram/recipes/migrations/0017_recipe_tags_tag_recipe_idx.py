@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Таблица связей рецептов и тегов создана Django автоматически, и у неё
+# есть только уникальный индекс (recipe_id, tag_id). Фильтр по тегам
+# ищет рецепты по tag_id, поэтому нужен индекс с tag_id впереди.
+INDEX_NAME = 'recipe_tags_tag_recipe_idx'
+
+
+def create_index(apps, schema_editor):
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        'ON recipes_recipe_tags (tag_id, recipe_id)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipe_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,201 @@
+import json
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Recipe, RecipeIngredient
+from .versions import get_versions
+
+BUILD_CHUNK_SIZE = 20000
+# Изменения, закоммиченные позже своего updated_at, догоняются повторным
+# просмотром последней минуты.
+REFRESH_OVERLAP = timedelta(minutes=1)
+# При большем числе изменённых рецептов индекс строится заново.
+MAX_INCREMENTAL = 2000
+
+
+class PantryIndex:
+    """Обратный индекс ингредиент -> рецепты в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта — число его ингредиентов, а рецепты сгруппированы
+    по этому числу, поэтому недостающие ингредиенты считаются без
+    обращения к БД. Записи своего процесса
+    применяются после коммита, записи других процессов догоняются по
+    updated_at рецептов при смене версии recipes. Смена версии
+    ingredients перестраивает индекс целиком. Удалённые другими
+    процессами рецепты остаются в индексе, их отсекает запрос к БД.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = None
+        self._postings = None
+        self._counts = None
+        self._by_count = None
+        self._seen = None
+        self._applied = {}
+
+    def _load(self):
+        versions = get_versions('recipes', 'ingredients')
+        if self._postings is not None and versions == self._versions:
+            return
+        with self._lock:
+            if versions == self._versions:
+                return
+            if (self._postings is None
+                    or versions[1] != self._versions[1]
+                    or not self._refresh()):
+                self._build()
+            self._versions = versions
+
+    def _build(self):
+        # Сортировка и DISTINCT в Python быстрее, чем ORDER BY в БД.
+        started = timezone.now()
+        groups = {}
+        for ingredient_id, recipe_id in RecipeIngredient.objects.values_list(
+            'ingredient_id', 'recipe_id'
+        ).iterator(chunk_size=BUILD_CHUNK_SIZE):
+            recipe_ids = groups.get(ingredient_id)
+            if recipe_ids is None:
+                recipe_ids = groups[ingredient_id] = []
+            recipe_ids.append(recipe_id)
+        # Recipe.id — BigAutoField, поэтому массивы 64-битные, а число
+        # ингредиентов хранится в словаре: id не обязаны идти подряд.
+        postings = {
+            ingredient_id: array('Q', sorted(set(recipe_ids)))
+            for ingredient_id, recipe_ids in groups.items()
+        }
+        counts = Counter()
+        for posting in postings.values():
+            counts.update(posting)
+        by_count = defaultdict(set)
+        for recipe_id, count in counts.items():
+            by_count[count].add(recipe_id)
+        self._postings, self._counts = postings, counts
+        self._by_count = by_count
+        self._seen = started
+        self._applied = {}
+
+    def _refresh(self):
+        """Применяет рецепты, изменённые с прошлой проверки.
+
+        Возвращает False, если изменений слишком много и индекс выгоднее
+        построить заново.
+        """
+        changed = dict(Recipe.objects.filter(
+            updated_at__gte=self._seen - REFRESH_OVERLAP
+        ).values_list('id', 'updated_at')[:MAX_INCREMENTAL + 1])
+        if len(changed) > MAX_INCREMENTAL:
+            return False
+        recipe_ids = [
+            recipe_id for recipe_id, updated_at in changed.items()
+            if self._applied.get(recipe_id) != updated_at
+        ]
+        self._apply(recipe_ids)
+        if changed:
+            self._seen = max(self._seen, *changed.values())
+        horizon = self._seen - REFRESH_OVERLAP
+        self._applied = {
+            recipe_id: updated_at for recipe_id, updated_at in changed.items()
+            if updated_at >= horizon
+        }
+        return True
+
+    def _apply(self, recipe_ids):
+        if not recipe_ids:
+            return
+        ingredients = {recipe_id: set() for recipe_id in recipe_ids}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients[recipe_id].add(ingredient_id)
+        postings, counts = self._postings, self._counts
+        for recipe_id, ingredient_ids in ingredients.items():
+            if counts[recipe_id]:
+                for posting in postings.values():
+                    index = bisect_left(posting, recipe_id)
+                    if index < len(posting) and posting[index] == recipe_id:
+                        del posting[index]
+            for ingredient_id in ingredient_ids:
+                insort(postings.setdefault(ingredient_id, array('Q')),
+                       recipe_id)
+            count = counts.pop(recipe_id, 0)
+            if count:
+                self._by_count[count].discard(recipe_id)
+            if ingredient_ids:
+                counts[recipe_id] = len(ingredient_ids)
+                self._by_count[len(ingredient_ids)].add(recipe_id)
+
+    def update_recipes(self, recipe_ids):
+        """Применяет изменения рецептов, сделанные в этом процессе."""
+        if self._postings is None:
+            return
+        with self._lock:
+            self._apply(list(recipe_ids))
+
+    def containing(self, ingredient_ids):
+        """Id рецептов, в которых есть хотя бы один из ингредиентов."""
+        self._load()
+        with self._lock:
+            return self._union(ingredient_ids)
+
+    def cookable(self, ingredient_ids, exclude_ids=(), max_missing=0):
+        """Id рецептов, которым не хватает не больше max_missing
+        ингредиентов из ingredient_ids и в которых нет exclude_ids.
+
+        Рецепт, в котором всего не больше max_missing ингредиентов,
+        подходит, даже если ни одного из них нет в ingredient_ids.
+        """
+        self._load()
+        with self._lock:
+            hits = Counter()
+            for ingredient_id in set(ingredient_ids):
+                hits.update(self._postings.get(ingredient_id, ()))
+            candidates = set(hits)
+            for count, recipe_ids in self._by_count.items():
+                if count <= max_missing:
+                    candidates.update(recipe_ids)
+            excluded = self._union(exclude_ids)
+            counts = self._counts
+            return sorted(
+                recipe_id for recipe_id in candidates
+                if counts[recipe_id] - hits[recipe_id] <= max_missing
+                and recipe_id not in excluded
+            )
+
+    def _union(self, ingredient_ids):
+        recipe_ids = set()
+        for ingredient_id in set(ingredient_ids):
+            recipe_ids.update(self._postings.get(ingredient_id, ()))
+        return recipe_ids
+
+
+def filter_recipe_ids(queryset, recipe_ids, exclude=False):
+    """Фильтрует рецепты по списку id одним параметром запроса.
+
+    Длинный список передаётся массивом в PostgreSQL и JSON в SQLite, а
+    не тысячами плейсхолдеров IN (...).
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return queryset if exclude else queryset.none()
+    if connection.vendor == 'postgresql':
+        condition = RawSQL('SELECT unnest(%s::bigint[])', (recipe_ids,))
+    elif connection.vendor == 'sqlite':
+        condition = RawSQL(
+            'SELECT value FROM json_each(%s)', (json.dumps(recipe_ids),))
+    else:
+        condition = recipe_ids
+    if exclude:
+        return queryset.exclude(id__in=condition)
+    return queryset.filter(id__in=condition)
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,134 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Recipe
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+BATCH_SIZE = 500
+# Окончания для грубого стемминга в SQLite, длинные проверяются первыми.
+ENDINGS = (
+    'ами', 'ями', 'ью', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ая', 'яя',
+    'ое', 'ее', 'ые', 'ие', 'ой', 'ей', 'ий', 'ый', 'ом', 'ем', 'ам', 'ям',
+    'ах', 'ях', 'ов', 'ев', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+)
+MIN_STEM = 3
+# Веса tsvector: название важнее ингредиентов, ингредиенты важнее текста.
+POSTGRES_UPDATE_SQL = f'''
+    UPDATE recipes_recipe AS recipe SET search_vector =
+        setweight(to_tsvector('{SEARCH_CONFIG}', recipe.name), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_recipeingredient AS recipe_ingredient
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = recipe_ingredient.ingredient_id
+            WHERE recipe_ingredient.recipe_id = recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', recipe.text), 'C')
+    WHERE recipe.id = ANY(%s)
+'''
+SQLITE_DELETE_SQL = f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({{}})'
+SQLITE_INSERT_SQL = f'''
+    INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text)
+    SELECT recipe.id, recipe.name, COALESCE((
+        SELECT group_concat(ingredient.name, ' ')
+        FROM recipes_recipeingredient AS recipe_ingredient
+        JOIN recipes_ingredient AS ingredient
+            ON ingredient.id = recipe_ingredient.ingredient_id
+        WHERE recipe_ingredient.recipe_id = recipe.id
+    ), ''), recipe.text
+    FROM recipes_recipe AS recipe
+    WHERE recipe.id IN ({{}})
+'''
+# bm25 в FTS5 отрицательный: чем меньше, тем лучше совпадение. Веса
+# столбцов идут в порядке name, ingredients, text.
+SQLITE_RANK_SQL = f'-bm25({FTS_TABLE}, 10.0, 4.0, 1.0)'
+
+
+def update_search_index(recipe_ids):
+    """Пересчитывает поисковый индекс для рецептов с указанными id.
+
+    В PostgreSQL заполняется столбец search_vector, в SQLite —
+    таблица FTS5. Id удалённых рецептов только убираются из индекса.
+    """
+    recipe_ids = list(recipe_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            batch = recipe_ids[start:start + BATCH_SIZE]
+            if connection.vendor == 'postgresql':
+                cursor.execute(POSTGRES_UPDATE_SQL, (batch,))
+            elif connection.vendor == 'sqlite':
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(SQLITE_DELETE_SQL.format(placeholders), batch)
+                cursor.execute(SQLITE_INSERT_SQL.format(placeholders), batch)
+
+
+def strip_ending(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def get_fts_query(text):
+    """Запрос FTS5: все слова обязательны и ищутся по префиксу.
+
+    Стемминга для русского в SQLite нет, поэтому у слов отрезается
+    окончание и ищется основа как префикс: «пампушки» находит
+    «пампушками». Однобуквенные слова вроде предлогов пропускаются.
+    """
+    return ' '.join(
+        f'"{strip_ending(word)}"*'
+        for word in re.findall(r'\w{2,}', text.casefold())
+    )
+
+
+def search_recipes(queryset, text):
+    """Оставляет рецепты, подходящие под запрос, и сортирует по релевантности.
+
+    Совпадения ищутся в названии, тексте и названиях ингредиентов.
+    Ранг сохраняется в аннотации search_rank, при равном ранге новые
+    рецепты идут первыми.
+    """
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query))
+    elif connection.vendor == 'sqlite':
+        fts_query = get_fts_query(text)
+        if not fts_query:
+            return queryset.none()
+        # Соединение с FTS5 вместо подзапроса: ранг в коррелированном
+        # подзапросе заново выполняет MATCH для каждой строки.
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE} MATCH %s',
+                   f'{FTS_TABLE}.rowid = recipes_recipe.id'],
+            params=[fts_query],
+            select={'search_rank': SQLITE_RANK_SQL},
+        )
+    else:
+        return queryset.filter(
+            Q(name__icontains=text) | Q(text__icontains=text)
+            | Q(ingredients__name__icontains=text)
+        ).distinct()
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+
+def rebuild_search_index(batch_size=10000):
+    """Переиндексирует все рецепты пачками, возвращает их число."""
+    total = 0
+    last_id = 0
+    while True:
+        recipe_ids = list(Recipe.objects.filter(
+            id__gt=last_id
+        ).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not recipe_ids:
+            return total
+        update_search_index(recipe_ids)
+        total += len(recipe_ids)
+        last_id = recipe_ids[-1]
@@ -0,0 +1,79 @@
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import RecipeIngredient, ShoppingCartIngredient, ShoppingList
+
+BATCH_SIZE = 1000
+
+
+def get_recipe_amounts(recipe):
+    """Возвращает словарь {id ингредиента: количество} для рецепта."""
+    return dict(
+        RecipeIngredient.objects.filter(recipe=recipe).order_by().values(
+            'ingredient'
+        ).annotate(total=Sum('amount')).values_list('ingredient', 'total')
+    )
+
+
+def get_amounts_delta(old, new):
+    return {
+        ingredient_id: new.get(ingredient_id, 0) - old.get(ingredient_id, 0)
+        for ingredient_id in old.keys() | new.keys()
+    }
+
+
+def update_shopping_cart_totals(user_ids, delta):
+    """Изменяет суммы ингредиентов в списках покупок пользователей.
+
+    delta — словарь {id ингредиента: изменение количества}. Недостающие
+    строки создаются с нулём, затем суммы увеличиваются одним UPDATE,
+    поэтому параллельные изменения не теряются.
+    """
+    delta = {
+        ingredient_id: amount
+        for ingredient_id, amount in delta.items() if amount
+    }
+    if not delta:
+        return
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    ShoppingCartIngredient.objects.bulk_create(
+        [ShoppingCartIngredient(user_id=user_id, ingredient_id=ingredient_id)
+         for user_id in user_ids
+         for ingredient_id, amount in delta.items() if amount > 0],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    totals = ShoppingCartIngredient.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=delta
+    )
+    totals.update(amount=F('amount') + Case(
+        *(When(ingredient_id=ingredient_id, then=Value(amount))
+          for ingredient_id, amount in delta.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+    totals.filter(amount__lte=0).delete()
+
+
+def compute_shopping_cart_totals(user_ids):
+    """Считает суммы ингредиентов по рецептам в списках покупок."""
+    return ShoppingList.objects.filter(
+        user_id__in=user_ids,
+        recipe__ingredient_list__isnull=False,
+    ).order_by().values(
+        'user_id', 'recipe__ingredient_list__ingredient_id'
+    ).annotate(amount=Sum('recipe__ingredient_list__amount')).values_list(
+        'user_id', 'recipe__ingredient_list__ingredient_id', 'amount'
+    )
+
+
+def rebuild_shopping_cart_totals(user_ids):
+    ShoppingCartIngredient.objects.filter(user_id__in=user_ids).delete()
+    ShoppingCartIngredient.objects.bulk_create(
+        [ShoppingCartIngredient(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount
+        ) for user_id, ingredient_id, amount
+            in compute_shopping_cart_totals(user_ids) if amount > 0],
+        batch_size=BATCH_SIZE,
+    )
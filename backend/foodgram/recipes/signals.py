@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from users.models import Subscription, User
+
+from .images import schedule_recipe_image
+from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingList, Tag)
+from .pantry_index import pantry_index
+from .search import update_search_index
+from .versions import bump_versions
+
+
+def bump_after_commit(*scopes):
+    transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+def reindex_recipes(recipe_ids):
+    update_search_index(recipe_ids)
+    pantry_index.update_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_indexes_changed(instance, **kwargs):
+    # Ингредиенты записываются после рецепта, поэтому индексы
+    # пересчитываются после коммита, но до смены версий в
+    # recipe_changed, чтобы кэш не сохранил старую выдачу.
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: reindex_recipes([recipe_id]))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    bump_after_commit('recipes', f'recipe:{instance.pk}')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    if (instance.image
+            and instance.image_variants.get('source') != instance.image.name):
+        transaction.on_commit(lambda: schedule_recipe_image(instance.pk))
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, **kwargs):
+    bump_after_commit('recipes', f'recipe:{instance.recipe_id}')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_after_commit('recipes', f'recipe:{instance.pk}')
+    else:
+        bump_after_commit(
+            'recipes', *(f'recipe:{pk}' for pk in pk_set or ()))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(**kwargs):
+    bump_after_commit('tags')
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: update_search_index(
+            RecipeIngredient.objects.filter(
+                ingredient=instance
+            ).values_list('recipe_id', flat=True).distinct()
+        ))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(**kwargs):
+    bump_after_commit('ingredients')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_after_commit('users')
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+def favorite_changed(instance, **kwargs):
+    # Избранное — самая частая запись, поэтому версия всей ленты не
+    # меняется: favorites_count в ленте отстаёт не дольше
+    # API_CACHE_TIMEOUT, а страница рецепта обновляется сразу.
+    bump_after_commit(
+        f'user:{instance.user_id}', f'recipe:{instance.recipe_id}')
+
+
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def user_relation_changed(instance, **kwargs):
+    bump_after_commit(f'user:{instance.user_id}')
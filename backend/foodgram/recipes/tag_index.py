@@ -0,0 +1,44 @@
+import threading
+
+from .models import Tag
+from .versions import get_versions
+
+
+class TagIndex:
+    """Соответствие slug -> id тегов в памяти процесса.
+
+    Загружается одним запросом и перечитывается, когда меняется версия
+    области tags, поэтому фильтр по тегам не обращается к таблице тегов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids = None
+
+    def get_ids(self, slugs=()):
+        """Возвращает соответствие slug -> id.
+
+        Если какого-то из slugs в нём нет, соответствие перечитывается:
+        тег мог появиться раньше, чем сменилась версия в этом процессе.
+        """
+        version, = get_versions('tags')
+        ids = self._ids
+        if (ids is not None and version == self._version
+                and all(slug in ids for slug in slugs)):
+            return ids
+        with self._lock:
+            if (self._ids is None or version != self._version
+                    or not all(slug in self._ids for slug in slugs)):
+                self._ids = dict(Tag.objects.values_list('slug', 'id'))
+                self._version = version
+            return self._ids
+
+
+tag_index = TagIndex()
+
+
+def get_tag_choices():
+    # Функция, а не метод: формы фильтров копируют choices через deepcopy,
+    # а блокировку индекса скопировать нельзя.
+    return [(slug, slug) for slug in sorted(tag_index.get_ids())]
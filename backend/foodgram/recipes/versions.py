@@ -0,0 +1,29 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'version:{}'
+
+
+def get_versions(*scopes):
+    """Возвращает текущие версии данных для перечисленных областей.
+
+    Версии хранятся в кэше Django. Если ключ отсутствует, он заводится
+    со значением от текущего времени, чтобы не совпасть с вытесненным.
+    """
+    keys = [VERSION_CACHE_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_versions(*scopes):
+    for scope in scopes:
+        key = VERSION_CACHE_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
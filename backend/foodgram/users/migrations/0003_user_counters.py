@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:30
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_related(related_model, related_field):
+    return Coalesce(models.Subquery(
+        related_model.objects.filter(
+            **{related_field: models.OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            count=models.Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def fill_user_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    User.objects.update(
+        recipes_count=count_related(
+            apps.get_model('recipes', 'Recipe'), 'author'),
+        followers_count=count_related(
+            apps.get_model('users', 'Subscription'), 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_auto_20230910_1521'),
+        ('recipes', '0013_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во рецептов'),
+        ),
+        migrations.RunPython(fill_user_counters, migrations.RunPython.noop),
+    ]
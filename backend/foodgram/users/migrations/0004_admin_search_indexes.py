@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Поиск в админке (^username, =email, =author__username) в PostgreSQL
+# выполняется через UPPER(...::text), поэтому нужны индексы по выражению.
+INDEXES = (
+    ('user_username_upper_idx', 'users_user', 'username'),
+    ('user_email_upper_idx', 'users_user', 'email'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'(UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -4,7 +4,33 @@ from django.db import models
 MAX_LEN = 150
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики при обычном save() существующей строки.
+
+    Счётчики меняются только запросом UPDATE с F() из recipes.counters,
+    поля maintained_fields — фоновым пересчётом после коммита. Полный
+    save() записал бы загруженные в память значения поверх изменений,
+    сделанных после загрузки объекта.
+    """
+
+    counter_fields = ()
+    maintained_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (update_fields is None and not self._state.adding
+                and not kwargs.get('force_insert')):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.name not in self.maintained_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     username = models.CharField(
         max_length=MAX_LEN,
         verbose_name="Имя пользователя",
@@ -33,6 +59,18 @@ class User(AbstractUser):
         verbose_name="Фамилия",
         help_text="Введите фамилию",
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name="Кол-во рецептов",
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Кол-во подписчиков",
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         verbose_name = "Пользователь"